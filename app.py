@@ -1,19 +1,52 @@
 import os
-from datetime import datetime, timedelta
+import json
+import gzip
+import hashlib
+import logging
+import math
+import time
+from io import BytesIO
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+import click
 from flask import (
     Flask, render_template, request, redirect, url_for,
-    flash, send_file, jsonify, session
+    flash, send_file, jsonify, session, Response, stream_with_context,
+    g, has_request_context, make_response
 )
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 from dotenv import load_dotenv
 
 # Utils
-from utils.shopify_utils import fetch_products, fetch_locations, set_inventory
-from utils.barcode_utils import generate_code128_png
-from utils.pdf_utils import label_pdf as build_label_pdf
+from utils.shopify_utils import ShopifyClient, is_retryable, backoff_seconds
+from utils.pdf_utils import label_pdf_bytes, label_pdf_png_bytes, label_sheet_pdf
+from utils.barcode_utils import code128_png_bytes
+from utils.bytes_lru import BytesLRU
+from utils.paging import table_params, keyset_page, count_rows
+from utils.export_utils import csv_chunks
+from utils.import_utils import read_product_csv
+from utils.text_utils import tr_fold, phone_key, looks_like_phone, prefix_range
+from utils.db_migrate import upgrade as upgrade_schema
+from utils.cart_store import MemoryCartStore, SqlCartStore, totals_of
+from utils.product_cache import BarcodeCache, ProductSnap
+from utils.search_index import ProductIndex
+from utils.metrics import Metrics, QueryTracker, QUERY_BUCKETS
+from utils.report_utils import (
+    day_bounds, daily_sums, daily_grouped_sums, series, range_total
+)
 
 load_dotenv()
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+log = logging.getLogger("stokk")
+
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "mss-secret")
 
@@ -26,36 +59,127 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 db = SQLAlchemy(app)
 
+# ---- Metrikler: istek süresi, istek başına sorgu, yavaş sorgu logu ----
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+metrics = Metrics()
+query_tracker = QueryTracker()
+metrics.counter("http_requests_total", "İstek sayısı (route, method, status)")
+metrics.histogram("http_request_duration_seconds", "İstek süresi")
+metrics.histogram("db_queries_per_request", "İstek başına SQL sorgu sayısı", QUERY_BUCKETS)
+metrics.histogram("db_query_duration_seconds", "Tek SQL sorgu süresi")
+metrics.counter("db_slow_queries_total", "SLOW_QUERY_MS üstü sorgular")
+metrics.histogram("shopify_request_duration_seconds", "Shopify Admin API çağrı süresi")
+metrics.counter("shopify_request_errors_total", "Başarısız Shopify çağrıları")
+metrics.histogram("label_render_seconds", "Etiket PDF üretim süresi")
+metrics.counter("labels_rendered_total", "Üretilen etiket sayısı")
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_start(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_t0", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_end(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("query_t0")
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    query_tracker.add(elapsed)
+    metrics.observe("db_query_duration_seconds", elapsed)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        where = request.endpoint if has_request_context() else threading.current_thread().name
+        metrics.inc("db_slow_queries_total", route=where or "-")
+        log.warning("Yavaş sorgu %.1f ms [%s]: %s", elapsed * 1000, where, " ".join(statement.split())[:1000])
+
+@event.listens_for(Engine, "handle_error")
+def _query_failed(exception_context):
+    # Hata veren sorgu after_cursor_execute'a ulaşmaz: başlangıç zamanı havuzdaki bağlantıda birikmesin
+    conn = exception_context.connection
+    stack = conn.info.get("query_t0") if conn is not None else None
+    if stack:
+        stack.pop()
+
+@app.before_request
+def _start_request_metrics():
+    g.t0 = time.perf_counter()
+    query_tracker.start()
+
+@app.after_request
+def _record_request_metrics(resp):
+    t0 = g.pop("t0", None)
+    if t0 is None:
+        return resp
+    elapsed = time.perf_counter() - t0
+    queries, sql_s = query_tracker.stop()
+    route = request.url_rule.rule if request.url_rule else "(eşleşmedi)"
+    metrics.inc("http_requests_total", route=route, method=request.method, status=resp.status_code)
+    metrics.observe("http_request_duration_seconds", elapsed, route=route, method=request.method)
+    metrics.observe("db_queries_per_request", queries, route=route)
+    resp.headers["Server-Timing"] = f'db;dur={sql_s * 1000:.1f};desc="{queries} sorgu", app;dur={elapsed * 1000:.1f}'
+    return resp
+
 # ===================== MODELS =====================
 class Settings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     shop_url = db.Column(db.String(255))
     api_token = db.Column(db.String(255))
     location_id = db.Column(db.String(64))
+    products_synced_at = db.Column(db.String(40))  # son senkronda görülen en yeni updated_at (UTC ISO)
+    synced_shop = db.Column(db.String(255))        # watermark hangi mağazaya ait
 
 class Customer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(200), nullable=False)
+    name = db.Column(db.String(200), nullable=False, index=True)  # keyset sıralama
     phone = db.Column(db.String(50))
     email = db.Column(db.String(200))
-    debt = db.Column(db.Float, default=0.0)
+    debt = db.Column(db.Float, default=0.0, index=True)  # veresiye listesi: debt > 0
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    search_key = db.Column(db.String(200), index=True)  # tr_fold(name)
+    phone_key = db.Column(db.String(32), index=True)    # sadece rakamlar
+
+@event.listens_for(Customer, "before_insert")
+@event.listens_for(Customer, "before_update")
+def _customer_search_keys(mapper, connection, target):
+    target.search_key = tr_fold(target.name)
+    target.phone_key = phone_key(target.phone) or None
 
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     source = db.Column(db.String(32), default="manual")  # shopify/manual
-    title = db.Column(db.String(255), nullable=False)
+    title = db.Column(db.String(255), nullable=False, index=True)  # keyset sıralama
     barcode = db.Column(db.String(64), unique=True)
     price = db.Column(db.Float, default=0.0)
-    stock = db.Column(db.Integer, default=0)
-    shopify_variant_id = db.Column(db.String(64))
+    stock = db.Column(db.Integer, default=0, index=True)  # düşük stok sayımı
+    shopify_variant_id = db.Column(db.String(64), index=True)
     shopify_inventory_item_id = db.Column(db.String(64))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    synced_at = db.Column(db.DateTime, index=True)  # Shopify'dan son değiştiği an
+    catalog_version = db.Column(db.Integer, index=True)  # ad/barkod/fiyat son değiştiğindeki katalog sürümü
+
+# Fiş başlığı: bir checkout = bir Order, satış satırları order_id ile bağlanır
+class Order(db.Model):
+    __tablename__ = "orders"
+    __table_args__ = (db.Index("ix_orders_customer_created", "customer_id", "created_at"),)
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=True)
+    payment = db.Column(db.String(20), default="nakit")
+    is_paid = db.Column(db.Boolean, default=True)
+    subtotal = db.Column(db.Float, default=0.0)   # etiket fiyatlarıyla
+    discount = db.Column(db.Float, default=0.0)
+    total = db.Column(db.Float, default=0.0)      # indirimli genel toplam
+    item_count = db.Column(db.Integer, default=0)  # toplam adet
+    line_count = db.Column(db.Integer, default=0)  # farklı ürün sayısı
 
 class Sale(db.Model):
+    __table_args__ = (
+        db.Index("ix_sale_customer_created", "customer_id", "created_at"),   # müşteri geçmişi
+        db.Index("ix_sale_created_paid_payment", "created_at", "is_paid", "payment"),  # raporlar
+    )
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('product.id'))
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), index=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True, index=True)
     qty = db.Column(db.Integer, default=1)
     unit_price = db.Column(db.Float, default=0.0)
     total_price = db.Column(db.Float, default=0.0)
@@ -64,13 +188,13 @@ class Sale(db.Model):
 
 class CreditPayment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'))
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), index=True)
     amount = db.Column(db.Float, default=0.0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
 class ReturnExchange(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     type = db.Column(db.String(16))  # iade/degisim
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=True)
     old_product_id = db.Column(db.Integer, db.ForeignKey('product.id'))
@@ -78,8 +202,88 @@ class ReturnExchange(db.Model):
     qty = db.Column(db.Integer, default=1)
     note = db.Column(db.String(255))
 
-with app.app_context():
-    db.create_all()
+# Stok defteri: Product.stock her değiştiğinde aynı transaction'da toplu eklenir, hiç güncellenmez.
+class StockMovement(db.Model):
+    __table_args__ = (db.Index("ix_stock_movement_product_created", "product_id", "created_at"),)
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    delta = db.Column(db.Integer, nullable=False)      # + giriş, - çıkış
+    reason = db.Column(db.String(16), nullable=False)  # sale/return/exchange/edit/sync/import/manual
+    ref_id = db.Column(db.Integer, nullable=True)      # fiş veya iade kaydı
+
+# Stok kontrol noktası: sadece stoğu değişen ürünler için satır yazılır.
+# drift = stok - (önceki nokta + aradaki hareketler); defter dışı değişikliği gösterir.
+class StockSnapshot(db.Model):
+    __table_args__ = (db.Index("ix_stock_snapshot_product_taken", "product_id", "taken_at"),)
+    id = db.Column(db.Integer, primary_key=True)
+    taken_at = db.Column(db.DateTime, nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    stock = db.Column(db.Integer, nullable=False)
+    drift = db.Column(db.Integer, nullable=True)  # ilk noktada bilinmez
+
+# Günlük özet (rollup): gün × ödeme tipi. Satış/tahsilat/iade anında artımlı güncellenir.
+class DailySummary(db.Model):
+    __table_args__ = (db.UniqueConstraint("day", "payment", name="uq_daily_summary_day_payment"),)
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    payment = db.Column(db.String(20), nullable=False)  # nakit/kart/veresiye/tahsilat/iade
+    revenue = db.Column(db.Float, default=0.0)      # satış tutarı (indirimli)
+    qty = db.Column(db.Integer, default=0)          # satılan adet
+    collections = db.Column(db.Float, default=0.0)  # veresiye tahsilatı
+    returns = db.Column(db.Integer, default=0)      # iade/değişimde geri alınan adet
+
+# Shopify stok gönderim kuyruğu (outbox): satışla aynı transaction'da yazılır,
+# arka plan worker'ı boşaltır. Aynı inventory item için sadece en son değer gönderilir.
+class ShopifyOutbox(db.Model):
+    __table_args__ = (db.Index("ix_shopify_outbox_status_next", "status", "next_attempt_at"),)
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    inventory_item_id = db.Column(db.String(64), nullable=False, index=True)
+    available = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(16), default="pending")  # pending/sending/done/failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_error = db.Column(db.String(255))
+
+# Arka plan işleri (Shopify senkronu, stok eşitleme, büyük etiket partileri, kontrol noktası): istek dışında çalışır, durum DB'de.
+class Job(db.Model):
+    __table_args__ = (db.Index("ix_job_status_created", "status", "created_at"),)
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    status = db.Column(db.String(16), default="queued")  # queued/running/done/failed
+    params = db.Column(db.Text)    # JSON
+    progress = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer)  # bilinmiyorsa NULL
+    message = db.Column(db.String(255))
+    result = db.Column(db.Text)    # JSON
+    output = db.deferred(db.Column(db.LargeBinary))  # üretilen dosya (ör. etiket PDF'i); durum sorgusunda yüklenmez
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+# Adlandırılmış sayaçlar (MS barkod sırası, katalog sürümü, outbox kilidi):
+# tek UPDATE ile artırılır, satır kilidi commit'e kadar sırayı korur.
+class Counter(db.Model):
+    name = db.Column(db.String(32), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+# Sunucu tarafı sepet satırları (CART_STORE=db)
+class CartLine(db.Model):
+    __table_args__ = (db.UniqueConstraint("cart_id", "product_id", name="uq_cart_line_cart_product"),)
+    id = db.Column(db.Integer, primary_key=True)
+    cart_id = db.Column(db.String(32), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    title = db.Column(db.String(255))
+    barcode = db.Column(db.String(64))
+    price = db.Column(db.Float, default=0.0)
+    qty = db.Column(db.Integer, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class DataVersion(db.Model):
+    # Tablo başına veri sürümü: yazan transaction içinde artar (sayfa önbelleği anahtarı)
+    name = db.Column(db.String(32), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
 
 # ===================== HELPERS =====================
 def get_settings():
@@ -94,83 +298,672 @@ def get_settings():
         db.session.commit()
     return s
 
+MS_COUNTER = "ms_barcode"
+
+def _ms_seed():
+    """Sayaç ilk oluşturulurken mevcut MS barkodlarının en büyüğü (tek seferlik tarama)."""
+    n = 0
+    for (code,) in db.session.query(Product.barcode).filter(Product.barcode.like("MS%")).yield_per(5000):
+        if code[2:].isdigit():
+            n = max(n, int(code[2:]))
+    return n
+
+def allocate_barcodes(count):
+    """count adet ardışık MS barkodu ayırır (tek UPDATE; commit çağırana ait)."""
+    if count <= 0:
+        return []
+    bump = db.update(Counter).where(Counter.name == MS_COUNTER).values(value=Counter.value + count)
+    if not db.session.execute(bump).rowcount:
+        try:
+            with db.session.begin_nested():
+                db.session.add(Counter(name=MS_COUNTER, value=_ms_seed()))
+        except IntegrityError:
+            pass  # başka istek aynı anda oluşturdu
+        db.session.execute(bump)
+    last = db.session.execute(db.select(Counter.value).where(Counter.name == MS_COUNTER)).scalar_one()
+    return [f"MS{n:06d}" for n in range(last - count + 1, last + 1)]
+
 def generate_internal_barcode():
-    last = Product.query.filter(Product.barcode.like("MS%")).order_by(Product.id.desc()).first()
-    n = 1
-    if last and last.barcode and last.barcode.startswith("MS"):
+    return allocate_barcodes(1)[0]
+
+# ---- Katalog sürümü (POS'un yerel barkod kataloğu için) ----
+# Ürünün ad/barkod/fiyatı değişince Counter("catalog") bir artar ve ürüne yazılır.
+# Sayaç satırı commit'e kadar kilitli kalır: sürümler commit sırasıyla görünür,
+# "since=N" delta'sı arada kalan değişikliği kaçırmaz.
+CATALOG_COUNTER = "catalog"
+CATALOG_FIELDS = ("title", "barcode", "price")
+
+def _insert_missing(session, model, rows):
+    """Eksik sayaç satırlarını ekler. Core savepoint: flush içinden de çağrılabilir;
+    aynı anda oluşturan başka istek varsa IntegrityError yutulur."""
+    conn = session.connection()
+    for row in rows:
+        try:
+            with conn.begin_nested():
+                conn.execute(db.insert(model).values(**row))
+        except IntegrityError:
+            pass
+
+def next_catalog_version(session=None):
+    """Katalog sürümünü bir artırır (satır yoksa oluşturulur; commit çağırana ait)."""
+    session = session or db.session
+    bump = db.update(Counter).where(Counter.name == CATALOG_COUNTER).values(value=Counter.value + 1)
+    if not session.execute(bump).rowcount:
+        _insert_missing(session, Counter, [{"name": CATALOG_COUNTER, "value": 0}])
+        session.execute(bump)
+    return session.execute(db.select(Counter.value).where(Counter.name == CATALOG_COUNTER)).scalar_one()
+
+def catalog_version():
+    return db.session.execute(db.select(Counter.value).where(Counter.name == CATALOG_COUNTER)).scalar() or 0
+
+@event.listens_for(db.session, "before_flush")
+def _stamp_catalog_version(session, flush_context, instances):
+    changed = [o for o in session.new if isinstance(o, Product)]
+    changed += [o for o in session.dirty if isinstance(o, Product) and any(
+        db.inspect(o).attrs[f].history.has_changes() for f in CATALOG_FIELDS)]
+    if changed:
+        v = next_catalog_version(session)
+        for o in changed:
+            o.catalog_version = v
+
+# ---- Tablo veri sürümleri (sayfa önbelleği geçersizleştirme) ----
+# Transaction'da yazılan tablolar session.info'da toplanır (ORM flush + toplu insert/update/delete),
+# commit'ten hemen önce tek UPDATE ile sürümleri artırılır. Sürümler DB'de olduğu için
+# tüm gunicorn worker'ları aynı anda geçersizleşir.
+VERSIONED_TABLES = ("product", "sale", "orders", "credit_payment", "customer", "daily_summary")
+
+def _note_writes(session, tables):
+    tables = {t for t in tables if t in VERSIONED_TABLES}
+    if tables:
+        session.info.setdefault("written_tables", set()).update(tables)
+
+@event.listens_for(db.session, "after_flush")
+def _track_flushed_tables(session, flush_context):
+    objs = list(session.new) + list(session.deleted) + [o for o in session.dirty if session.is_modified(o)]
+    _note_writes(session, {o.__table__.name for o in objs})
+
+@event.listens_for(db.session, "do_orm_execute")
+def _track_bulk_writes(state):
+    table = getattr(state.statement, "table", None)  # text() yazımları izlenmez
+    if table is not None and (state.is_insert or state.is_update or state.is_delete):
+        _note_writes(state.session, {table.name})
+
+@event.listens_for(db.session, "before_commit")
+def _bump_data_versions(session):
+    session.flush()  # bekleyen nesneler de sayılsın
+    tables = session.info.pop("written_tables", None)
+    if tables:
+        bump = db.update(DataVersion).where(DataVersion.name.in_(sorted(tables))).values(value=DataVersion.value + 1)
+        if session.execute(bump).rowcount < len(tables):
+            have = {n for (n,) in session.execute(db.select(DataVersion.name))}
+            _insert_missing(session, DataVersion, [{"name": n, "value": 1} for n in sorted(tables - have)])
+
+@event.listens_for(db.session, "after_transaction_end")
+def _forget_written_tables(session, transaction):
+    if transaction.parent is None:  # savepoint geri alımı dış transaction'ın yazımlarını silmesin
+        session.info.pop("written_tables", None)
+
+def data_versions(tables):
+    return dict(db.session.execute(db.select(DataVersion.name, DataVersion.value)
+                                   .where(DataVersion.name.in_(tables))).all())
+
+def ensure_data_versions():
+    have = {n for (n,) in db.session.query(DataVersion.name)}
+    for name in VERSIONED_TABLES:
+        if name not in have:
+            db.session.add(DataVersion(name=name, value=0))
+    db.session.commit()
+
+# ---- Sayfa önbelleği ----
+# Anahtar = yol + parametreler + bağımlı tabloların sürümleri (+ gün). Değişmemiş veride
+# render yapılmaz; If-None-Match tutarsa gövdesiz 304 döner. Bellek PAGE_CACHE_MB ile sınırlı.
+page_cache = BytesLRU(max_items=int(os.getenv("PAGE_CACHE_SIZE", "256")),
+                      max_bytes=int(float(os.getenv("PAGE_CACHE_MB", "16")) * 1024 * 1024))
+metrics.counter("page_cache_requests_total", "Sayfa önbelleği (route, sonuç: hit/miss/304/bypass)")
+
+def cached_page(*tables, daily=False):
+    """tables'a yazılmadıkça aynı GET için önbellekteki çıktıyı döner.
+    daily=True: gün değişince de yenilenir (bugün/ay özetleri).
+    DataTables isteklerinde draw sayacı anahtar dışıdır, yanıta her seferinde eklenir."""
+    def deco(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            route = request.url_rule.rule if request.url_rule else request.path
+            if session.get("_flashes"):  # flash mesajı olan sayfa kişiye özel
+                metrics.inc("page_cache_requests_total", route=route, result="bypass")
+                return view(*args, **kwargs)
+            draw = request.args.get("draw", type=int)
+            params = sorted((k, v) for k, v in request.args.items(multi=True) if k not in ("draw", "_"))
+            versions = data_versions(tables)
+            key = (request.path, tuple(params), tuple(versions.get(t, 0) for t in tables),
+                   datetime.utcnow().date().isoformat() if daily else None)
+            etag = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+            if draw is None and request.if_none_match.contains(etag):
+                metrics.inc("page_cache_requests_total", route=route, result="304")
+                return Response(status=304, headers={"ETag": f'"{etag}"'})
+
+            cached = page_cache.get(key)
+            if cached is None:
+                resp = make_response(view(*args, **kwargs))
+                if resp.status_code != 200 or resp.direct_passthrough:
+                    return resp
+                body = resp.get_data()
+                if draw is not None and resp.is_json:
+                    data = resp.get_json()
+                    data.pop("draw", None)
+                    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+                cached = page_cache.put(key, resp.mimetype.encode() + b"\n" + body)
+                result = "miss"
+            else:
+                result = "hit"
+            metrics.inc("page_cache_requests_total", route=route, result=result)
+            mimetype, _, body = cached.partition(b"\n")
+            if draw is not None and mimetype == b"application/json":
+                body = b'{"draw":%d,' % draw + body[1:] if body != b"{}" else b'{"draw":%d}' % draw
+            resp = Response(body, mimetype=mimetype.decode())
+            if draw is None:
+                resp.headers["ETag"] = f'"{etag}"'
+                resp.headers["Cache-Control"] = "no-cache"
+            return resp
+        return wrapper
+    return deco
+
+def _shopify_metric(endpoint, seconds, ok):
+    metrics.observe("shopify_request_duration_seconds", seconds, endpoint=endpoint)
+    if not ok:
+        metrics.inc("shopify_request_errors_total", endpoint=endpoint)
+
+_shopify_clients = {}
+_shopify_clients_lock = threading.Lock()
+
+def shopify_client(s):
+    """(mağaza, token) başına tek, süreç içinde paylaşılan istemci (bağlantı havuzu + hız sınırı)."""
+    key = (s.shop_url, s.api_token)
+    with _shopify_clients_lock:
+        client = _shopify_clients.get(key)
+        if client is None:
+            client = ShopifyClient(s.shop_url, s.api_token, base_url=os.getenv("SHOPIFY_API_BASE"),
+                                   on_request=_shopify_metric)
+            _shopify_clients[key] = client
+    return client
+
+# ---- Barkod önbelleği (okuma sıcak yolu) ----
+barcode_cache = BarcodeCache()
+product_index = ProductIndex()  # ad/barkod araması
+
+# Önbellekler süreç başınadır; hangi katalog sürümünü yansıttıkları burada tutulur.
+# Başka worker/job/import'un değişikliği katalog sayacını ilerletir, istek başına bir
+# kez kontrol edilip sadece değişen ürünler (catalog_version > yerel) yeniden okunur.
+CACHE_DELTA_MAX = 5000
+_cache_version = None
+_cache_lock = threading.Lock()
+
+def warm_barcode_cache():
+    global _cache_version
+    version = catalog_version()  # satırlardan önce: arada gelen değişiklik sonraki delta'da okunur
+    rows = db.session.query(Product.id, Product.title, Product.barcode, Product.price).yield_per(5000).all()
+    product_index.warm(rows)
+    n = barcode_cache.warm(rows)
+    _cache_version = version
+    return n
+
+def sync_product_caches():
+    """Barkod önbelleği + arama index'ini paylaşılan katalog sürümüne getirir (istek başına bir sorgu)."""
+    global _cache_version
+    if has_request_context():
+        if g.get("caches_synced"):
+            return
+        g.caches_synced = True
+    version = catalog_version()
+    if version == _cache_version:
+        return
+    with _cache_lock:
+        known = _cache_version
+        if known == version:
+            return
+        if known is None:
+            warm_barcode_cache()
+            return
+        rows = db.session.query(Product.id, Product.title, Product.barcode, Product.price)\
+            .filter(Product.catalog_version > known).limit(CACHE_DELTA_MAX + 1).all()
+        if len(rows) > CACHE_DELTA_MAX:
+            warm_barcode_cache()
+            return
+        for row in rows:
+            cache_product(*row)
+        _cache_version = version
+
+def cache_product(pid, title, barcode, price):
+    """Ürün değişikliğini barkod önbelleğine ve arama index'ine yansıt (commit sonrası)."""
+    barcode_cache.put(pid, title, barcode, price)
+    product_index.put(pid, title, barcode, price)
+
+def lookup_barcode(code):
+    """Barkod -> ProductSnap; ıskada DB'den sadece gerekli kolonlar okunur."""
+    if not code:
+        return None
+    sync_product_caches()
+    snap = barcode_cache.get(code)
+    if snap is None:
+        row = db.session.query(Product.id, Product.title, Product.barcode, Product.price)\
+            .filter(Product.barcode == code).first()
+        if row:
+            barcode_cache.put(*row)
+            snap = ProductSnap(*row)
+    return snap
+
+def queue_shopify_stock(prod: Product):
+    """Ürünün güncel stoğunu outbox'a yaz (commit çağırana ait, HTTP çağrısı yok)."""
+    if not prod.shopify_inventory_item_id:
+        return
+    db.session.add(ShopifyOutbox(inventory_item_id=prod.shopify_inventory_item_id,
+                                 available=int(prod.stock or 0)))
+    db.session.info["outbox_pending"] = True
+
+def record_stock_moves(moves, reason, ref_id=None, when=None):
+    """Stok defterine toplu ekleme: moves = [(product_id, delta), ...]; sıfırlar atlanır (commit çağırana ait)."""
+    when = when or datetime.utcnow()
+    rows = [{"created_at": when, "product_id": pid, "delta": int(d), "reason": reason, "ref_id": ref_id}
+            for pid, d in moves if d]
+    if rows:
+        db.session.execute(db.insert(StockMovement), rows)
+
+def queue_shopify_stocks(levels):
+    """Toplu outbox yazımı: levels = [(inventory_item_id, available), ...]."""
+    rows = [{"inventory_item_id": item, "available": int(qty or 0)} for item, qty in levels if item]
+    if rows:
+        db.session.execute(db.insert(ShopifyOutbox), rows)
+        db.session.info["outbox_pending"] = True
+
+# ---- Shopify outbox worker ----
+OUTBOX_BATCH = 200
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_POLL_SECONDS = float(os.getenv("SHOPIFY_OUTBOX_POLL", "5"))
+_outbox_wakeup = threading.Event()
+_outbox_thread = None
+_outbox_lock = threading.Lock()
+
+OUTBOX_CLAIM = "outbox_claim"
+OUTBOX_LEASE_SECONDS = 300  # sending'de kalan (çöken worker) kayıt bu süreden sonra geri alınır
+
+def claim_outbox(batch):
+    """Vadesi gelen kayıtları 'sending' olarak sahiplenir; [(id, item, available, attempts)] döner.
+
+    Sahiplenme Counter(OUTBOX_CLAIM) satır kilidiyle sıralanır (Postgres'te ikinci worker
+    commit'e kadar bekler). Başka worker'ın gönderdiği item atlanır: aynı item için eski
+    değer yenisinden sonra gönderilemez. HTTP çağrılarından önce commit edilir.
+    """
+    O = ShopifyOutbox
+    now = datetime.utcnow()
+    lock = db.update(Counter).where(Counter.name == OUTBOX_CLAIM).values(value=Counter.value + 1)
+    if not db.session.execute(lock).rowcount:
         try:
-            n = int(last.barcode[2:]) + 1
-        except:
-            n = 1
-    return f"MS{n:06d}"
+            with db.session.begin_nested():
+                db.session.add(Counter(name=OUTBOX_CLAIM, value=0))
+        except IntegrityError:
+            pass  # başka worker aynı anda oluşturdu
+        db.session.execute(lock)
+    db.session.execute(db.update(O).where(O.status == "sending", O.next_attempt_at < now)
+                       .values(status="pending"))
+    busy = db.select(O.inventory_item_id).where(O.status == "sending")
+    rows = db.session.execute(
+        db.select(O.id, O.inventory_item_id, O.available, O.attempts)
+        .where(O.status == "pending", O.next_attempt_at <= now, O.inventory_item_id.notin_(busy))
+        .order_by(O.id).limit(batch)).all()
+    if rows:
+        db.session.execute(db.update(O).where(O.id.in_([r.id for r in rows]))
+                           .values(status="sending", next_attempt_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS)))
+    db.session.commit()
+    return [tuple(r) for r in rows]
 
-def adjust_shopify_stock(prod: Product):
+def drain_outbox(batch=OUTBOX_BATCH):
+    """Vadesi gelen kayıtları item bazında birleştirip gönderir; işlenen item sayısını döner."""
     s = get_settings()
-    if not (prod.shopify_inventory_item_id and s.shop_url and s.api_token and s.location_id):
+    if not (s.shop_url and s.api_token and s.location_id):
+        return 0
+    client, location_id = shopify_client(s), s.location_id
+    claimed = claim_outbox(batch)
+    latest = {}
+    for rid, item_id, available, attempts in claimed:
+        latest[item_id] = (rid, available, attempts)  # id sırasıyla geldiği için son kalan en yenisi
+
+    O = ShopifyOutbox
+    for item_id, (rid, available, attempts) in latest.items():
+        this = db.update(O).where(O.id == rid)
+        try:
+            client.set_inventory(location_id, item_id, available)
+            db.session.execute(this.values(status="done", last_error=None))
+        except Exception as e:
+            attempts = (attempts or 0) + 1
+            err = str(e)[:255]
+            if is_retryable(e) and attempts < OUTBOX_MAX_ATTEMPTS:
+                db.session.execute(this.values(
+                    status="pending", attempts=attempts, last_error=err,
+                    next_attempt_at=datetime.utcnow() + timedelta(seconds=backoff_seconds(attempts, e))))
+            else:
+                db.session.execute(this.values(status="failed", last_error=err, attempts=attempts))
+            log.warning("Shopify stok güncelleme hatası: %s %s", item_id, err)
+        # Aynı item'ın eski kayıtları (bu partidekiler ve backoff'ta bekleyenler) bu kayda devredildi;
+        # sonradan gönderilip yeni değeri ezemezler. Item başka worker'da değil (claim_outbox).
+        db.session.execute(db.update(O).where(O.inventory_item_id == item_id, O.id < rid,
+                                              O.status.in_(("pending", "sending")))
+                           .values(status="done", last_error="birleştirildi"))
+        db.session.commit()
+    return len(latest)
+
+@event.listens_for(db.session, "after_commit")
+def _wake_outbox_worker(session):
+    # Worker'ı commit'ten sonra uyandır (öncesinde kayıtlar görünmez)
+    if session.info.pop("outbox_pending", False):
+        _outbox_wakeup.set()
+
+@event.listens_for(db.session, "after_rollback")
+def _forget_outbox_wakeup(session):
+    session.info.pop("outbox_pending", None)
+
+def outbox_stats():
+    now = datetime.utcnow()
+    counts = dict(db.session.query(ShopifyOutbox.status, db.func.count(ShopifyOutbox.id))
+                  .group_by(ShopifyOutbox.status).all())
+    due = ShopifyOutbox.query.filter(ShopifyOutbox.status == "pending",
+                                     ShopifyOutbox.next_attempt_at <= now).count()
+    oldest = db.session.query(db.func.min(ShopifyOutbox.created_at))\
+        .filter(ShopifyOutbox.status == "pending").scalar()
+    return {
+        "pending": counts.get("pending", 0),
+        "due": due,
+        "failed": counts.get("failed", 0),
+        "done": counts.get("done", 0),
+        "oldest_pending_age_s": round((now - oldest).total_seconds(), 1) if oldest else 0,
+    }
+
+def outbox_worker_loop():
+    while True:
+        _outbox_wakeup.wait(timeout=OUTBOX_POLL_SECONDS)
+        _outbox_wakeup.clear()
+        with app.app_context():
+            try:
+                while drain_outbox():
+                    pass
+            except Exception:
+                log.exception("Shopify outbox worker hatası")
+            finally:
+                db.session.remove()
+
+def ensure_outbox_worker():
+    """Web süreci içinde daemon thread başlat (SHOPIFY_OUTBOX_WORKER=off ise ayrı süreç kullanılır)."""
+    global _outbox_thread
+    if os.getenv("SHOPIFY_OUTBOX_WORKER", "thread") != "thread" or _outbox_thread:
         return
-    try:
-        set_inventory(s.shop_url, s.api_token, s.location_id, prod.shopify_inventory_item_id, prod.stock)
-    except Exception as e:
-        print("Shopify stok güncelleme hatası:", e)
+    with _outbox_lock:
+        if not _outbox_thread:
+            _outbox_thread = threading.Thread(target=outbox_worker_loop, name="shopify-outbox", daemon=True)
+            _outbox_thread.start()
+
+@app.before_request
+def _start_background_workers():
+    ensure_outbox_worker()
+
+@app.cli.command("shopify-worker")
+def shopify_worker_command():
+    """Outbox'ı ayrı süreçte boşalt (web tarafında SHOPIFY_OUTBOX_WORKER=off)."""
+    click.echo("Shopify outbox worker başladı.")
+    outbox_worker_loop()
+
+# ---- Arka plan işleri ----
+# JOB_RUNNER=thread: web süreci içinde thread pool; external: 'flask job-worker' süreci çalıştırır.
+JOB_RUNNER = os.getenv("JOB_RUNNER", "thread")
+JOB_HANDLERS = {}
+_job_pool = ThreadPoolExecutor(max_workers=int(os.getenv("JOB_WORKERS", "2")), thread_name_prefix="job")
+
+def job_handler(kind):
+    def deco(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return deco
+
+JOB_TIMEOUT_MINUTES = int(os.getenv("JOB_TIMEOUT_MINUTES", "60"))
+
+def sweep_stuck_jobs():
+    """Worker çöktüğü/yeniden başladığı için 'running'de kalan işleri başarısız say."""
+    cutoff = datetime.utcnow() - timedelta(minutes=JOB_TIMEOUT_MINUTES)
+    n = Job.query.filter(Job.status == "running", Job.started_at < cutoff)\
+        .update({"status": "failed", "finished_at": datetime.utcnow(),
+                 "message": "Zaman aşımı: iş yarıda kaldı (worker durdu?)"}, synchronize_session=False)
+    db.session.commit()
+    if n:
+        log.warning("%d iş zaman aşımıyla başarısız sayıldı", n)
+    return n
+
+def submit_job(kind, **params):
+    if JOB_RUNNER == "thread":
+        sweep_stuck_jobs()  # ayrı worker yok: süpürme iş eklerken yapılır
+    job = Job(kind=kind, params=json.dumps(params))
+    db.session.add(job)
+    db.session.commit()
+    if JOB_RUNNER == "thread":
+        _job_pool.submit(run_job, job.id)
+    return job
+
+def job_progress(job_id, progress, total=None, message=None):
+    """İşin ilerlemesini ayrı kısa bir UPDATE ile yaz (iş kendi transaction'ını sürdürür)."""
+    values = {"progress": progress}
+    if total is not None:
+        values["total"] = total
+    if message is not None:
+        values["message"] = message[:255]
+    with db.engine.begin() as conn:
+        conn.execute(db.update(Job).where(Job.id == job_id).values(**values))
+
+def run_job(job_id):
+    with app.app_context():
+        try:
+            # queued -> running geçişini sadece bir runner kazanır
+            claimed = Job.query.filter_by(id=job_id, status="queued")\
+                .update({"status": "running", "started_at": datetime.utcnow()})
+            db.session.commit()
+            if not claimed:
+                return
+            job = db.session.get(Job, job_id)
+            kind, params = job.kind, json.loads(job.params or "{}")
+            try:
+                result = JOB_HANDLERS[kind](job_id, **params)
+                values = {"status": "done", "result": json.dumps(result)}
+            except Exception as e:
+                db.session.rollback()
+                log.exception("İş hatası (%s #%s)", kind, job_id)
+                values = {"status": "failed", "message": str(e)[:255]}
+            values["finished_at"] = datetime.utcnow()
+            Job.query.filter_by(id=job_id).update(values)
+            db.session.commit()
+        finally:
+            db.session.remove()
+
+def job_to_dict(job):
+    return {
+        "id": job.id, "kind": job.kind, "status": job.status,
+        "progress": job.progress or 0, "total": job.total, "message": job.message,
+        "result": json.loads(job.result) if job.result else None,
+        "download_url": url_for("job_download", job_id=job.id)
+        if job.status == "done" and job.result and "file" in json.loads(job.result) else None,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
 
-# ---- Cart helpers (session) ----
-def get_cart():
-    return session.get("cart", [])
+@app.cli.command("job-worker")
+@click.option("--poll", default=2.0, help="Kuyruk kontrol aralığı (sn)")
+def job_worker_command(poll):
+    """Kuyruktaki işleri ayrı süreçte çalıştır (web tarafında JOB_RUNNER=external)."""
+    click.echo("İş worker'ı başladı.")
+    while True:
+        with app.app_context():
+            sweep_stuck_jobs()
+            ids = [j.id for j in Job.query.filter_by(status="queued").order_by(Job.id.asc()).limit(10)]
+            db.session.remove()
+        for job_id in ids:
+            run_job(job_id)
+        if not ids:
+            time.sleep(poll)
+
+# ---- Rapor helpers (DailySummary rollup) ----
+PAY_LABELS = ["nakit", "kart", "veresiye"]
+
+def bump_summary(payment, when=None, **deltas):
+    """Rollup satırını aynı transaction içinde atomik olarak artır (commit çağırana ait)."""
+    day = (when or datetime.utcnow()).date()
+    row = DailySummary.query.filter_by(day=day, payment=payment).first()
+    if not row:
+        try:
+            with db.session.begin_nested():
+                row = DailySummary(day=day, payment=payment, revenue=0.0, qty=0,
+                                   collections=0.0, returns=0)
+                db.session.add(row)
+        except IntegrityError:
+            # Başka bir terminal aynı anda oluşturdu
+            row = DailySummary.query.filter_by(day=day, payment=payment).first()
+    for k, v in deltas.items():
+        setattr(row, k, db.func.coalesce(getattr(DailySummary, k), 0) + v)
+    db.session.flush()
+
+def rebuild_summary(since=None):
+    """Rollup'ı ham tablolardan yeniden hesapla (backfill). since: date veya None (tümü)."""
+    first = since
+    if first is None:
+        oldest = [db.session.query(db.func.min(m.created_at)).scalar()
+                  for m in (Sale, CreditPayment, ReturnExchange)]
+        first = min([o for o in oldest if o], default=datetime.utcnow()).date()
+    last = datetime.utcnow().date()
+    start, end = day_bounds(first, last)
+
+    sales = daily_grouped_sums(db.session, Sale.created_at, Sale.payment,
+                               (Sale.total_price, Sale.qty), start, end)
+    collections = daily_sums(db.session, CreditPayment.created_at, CreditPayment.amount, start, end)
+    returns = daily_sums(db.session, ReturnExchange.created_at, ReturnExchange.qty, start, end)
+
+    DailySummary.query.filter(DailySummary.day >= first).delete(synchronize_session=False)
+    rows = [dict(day=d, payment=pay, revenue=float(rev), qty=int(q), collections=0.0, returns=0)
+            for (d, pay), (rev, q) in sales.items()]
+    rows += [dict(day=d, payment="tahsilat", revenue=0.0, qty=0, collections=v, returns=0)
+             for d, v in collections.items()]
+    rows += [dict(day=d, payment="iade", revenue=0.0, qty=0, collections=0.0, returns=int(v))
+             for d, v in returns.items()]
+    if rows:
+        db.session.execute(db.insert(DailySummary), rows)
+    db.session.commit()
+    return len(rows)
+
+def summary_report(first_day, last_day):
+    """Aralık için ({gün: ödenmiş satış}, {gün: tahsilat}, [ödeme tipi toplamları])."""
+    rows = DailySummary.query.filter(DailySummary.day >= first_day,
+                                     DailySummary.day <= last_day).all()
+    sales, collections, pay = {}, {}, dict.fromkeys(PAY_LABELS, 0.0)
+    for r in rows:
+        if r.payment in ("nakit", "kart"):
+            sales[r.day] = sales.get(r.day, 0.0) + (r.revenue or 0.0)
+        if r.payment in pay:
+            pay[r.payment] += r.revenue or 0.0
+        if r.collections:
+            collections[r.day] = collections.get(r.day, 0.0) + r.collections
+    return sales, collections, [pay[p] for p in PAY_LABELS]
+
+def basket_stats(first_day, last_day):
+    """Aralıktaki fişlerin sayısı, ortalama sepet tutarı ve fiş başına adet.
+    Fiş başlıklarından (Order) hesaplanır: fiş öncesi eski satışlar ortalamaya karışmaz."""
+    start, end = day_bounds(first_day, last_day)
+    orders, revenue, qty = db.session.query(
+        db.func.count(Order.id), db.func.coalesce(db.func.sum(Order.total), 0.0),
+        db.func.coalesce(db.func.sum(Order.item_count), 0)
+    ).filter(Order.created_at >= start, Order.created_at < end).one()
+    return {"orders": orders,
+            "avg_basket": round(revenue / orders, 2) if orders else 0.0,
+            "items_per_order": round(qty / orders, 2) if orders else 0.0}
+
+@app.cli.command("rebuild-summary")
+@click.option("--since", default=None, help="YYYY-MM-DD (boş: tüm geçmiş)")
+def rebuild_summary_command(since):
+    """DailySummary tablosunu ham satış/tahsilat/iade kayıtlarından yeniden oluştur."""
+    n = rebuild_summary(datetime.strptime(since, "%Y-%m-%d").date() if since else None)
+    click.echo(f"{n} özet satırı yazıldı.")
+
+def backfill_customer_keys(batch=1000):
+    """search_key'i boş müşterileri (eski kayıtlar) toplu doldurur."""
+    n = 0
+    while True:
+        rows = db.session.query(Customer.id, Customer.name, Customer.phone)\
+            .filter(Customer.search_key.is_(None)).limit(batch).all()
+        if not rows:
+            break
+        db.session.execute(db.update(Customer), [
+            {"id": cid, "search_key": tr_fold(name), "phone_key": phone_key(phone) or None}
+            for cid, name, phone in rows])
+        db.session.commit()
+        n += len(rows)
+    return n
 
-def save_cart(cart):
-    session["cart"] = cart
-    session.modified = True
+# Şema ve tek seferlik veri adımları import'ta değil, dağıtımda tek süreçte çalışır (Procfile: flask db-upgrade);
+# aksi halde her worker aynı ALTER TABLE/CREATE INDEX ve özet satırları için yarışır.
+# Barkod önbelleği ilk istekte sync_product_caches ile ısınır.
+def upgrade_database():
+    db.create_all()
+    # Mevcut veritabanlarına yeni kolon/index'leri ekle
+    for change in upgrade_schema(db.engine, db.metadata):
+        log.info("Şema güncellendi: %s", change)
+    # İlk kurulumda (rollup boş, satış var) backfill; büyük geçmişte `flask rebuild-summary` ayrıca çalıştırılabilir
+    if not DailySummary.query.first() and Sale.query.first():
+        rebuild_summary()
+    backfill_customer_keys()
+    ensure_data_versions()
+    _insert_missing(db.session, Counter, [{"name": CATALOG_COUNTER, "value": 0}])
+    db.session.commit()
+
+@app.cli.command("db-upgrade")
+def db_upgrade_command():
+    """Tablo/kolon/index'ler, özet backfill, müşteri anahtarları ve sayaç satırları (gunicorn'dan önce bir kez)."""
+    upgrade_database()
+    click.echo("Veritabanı güncel.")
+
+# ---- Cart helpers (sunucu tarafı store, cookie'de sadece cart_id) ----
+# CART_STORE=db: tablo (çoklu worker/terminal), memory: tek süreç LRU+TTL
+if os.getenv("CART_STORE", "db") == "memory":
+    cart_store = MemoryCartStore()
+else:
+    cart_store = SqlCartStore(db.session, CartLine)
+
+def current_cart_id():
+    """X-Cart-Id başlığı (paylaşılan terminal sepeti) veya oturumdaki sepet."""
+    cid = request.headers.get("X-Cart-Id") or session.get("cart_id")
+    if not cid:
+        cid = session["cart_id"] = uuid.uuid4().hex
+    return cid[:32]
+
+def get_cart():
+    return cart_store.lines(current_cart_id())
 
 def cart_totals(cart):
-    total_qty = sum(int(i["qty"]) for i in cart)
-    total_amount = sum(float(i["qty"]) * float(i["price"]) for i in cart)
-    return {"qty": total_qty, "amount": round(total_amount, 2)}
+    return totals_of(cart)
 
 # ===================== ROUTES =====================
 
 # ---- Dashboard
 @app.route("/")
+@cached_page("daily_summary", "customer", "product", daily=True)
 def dashboard():
     today = datetime.utcnow().date()
-    month_start = datetime(today.year, today.month, 1)
+    month_start = today.replace(day=1)
+    week_start = today - timedelta(days=6)
 
-    today_sales = db.session.query(db.func.coalesce(db.func.sum(Sale.total_price), 0.0))\
-        .filter(Sale.is_paid == True, db.func.date(Sale.created_at) == today).scalar()
-    today_collections = db.session.query(db.func.coalesce(db.func.sum(CreditPayment.amount), 0.0))\
-        .filter(db.func.date(CreditPayment.created_at) == today).scalar()
-
-    month_sales = db.session.query(db.func.coalesce(db.func.sum(Sale.total_price), 0.0))\
-        .filter(Sale.is_paid == True, Sale.created_at >= month_start).scalar()
-    month_collections = db.session.query(db.func.coalesce(db.func.sum(CreditPayment.amount), 0.0))\
-        .filter(CreditPayment.created_at >= month_start).scalar()
+    sales, collections, _ = summary_report(min(month_start, week_start), today)
 
     open_credit = db.session.query(db.func.coalesce(db.func.sum(Customer.debt), 0.0)).scalar()
     low_stock = Product.query.filter(Product.stock <= 2).count()
 
-    labels, vals = [], []
-    for i in range(6, -1, -1):
-        d = today - timedelta(days=i)
-        v = db.session.query(db.func.coalesce(db.func.sum(Sale.total_price), 0.0))\
-            .filter(Sale.is_paid == True, db.func.date(Sale.created_at) == d).scalar()
-        c = db.session.query(db.func.coalesce(db.func.sum(CreditPayment.amount), 0.0))\
-            .filter(db.func.date(CreditPayment.created_at) == d).scalar()
-        labels.append(d.strftime("%d.%m"))
-        vals.append(float(v) + float(c))
-
-    pay_labels = ["nakit", "kart", "veresiye"]
-    pay_values = []
-    for p in pay_labels:
-        if p == "veresiye":
-            v = db.session.query(db.func.coalesce(db.func.sum(Sale.total_price), 0.0))\
-                .filter(Sale.payment == "veresiye").scalar()
-        else:
-            v = db.session.query(db.func.coalesce(db.func.sum(Sale.total_price), 0.0))\
-                .filter(Sale.payment == p, Sale.is_paid == True).scalar()
-        pay_values.append(float(v))
+    labels, vals = series(week_start, today, sales, collections)
+    pay_labels = PAY_LABELS
+    pay_values = summary_report(month_start, today)[2]
 
     kpis = {
-        "today_revenue": float(today_sales) + float(today_collections),
-        "month_revenue": float(month_sales) + float(month_collections),
+        "today_revenue": range_total(today, today, sales, collections),
+        "month_revenue": range_total(month_start, today, sales, collections),
         "open_credit": float(open_credit),
         "low_stock": low_stock
     }
@@ -181,9 +974,34 @@ def dashboard():
 
 # ---- Products
 @app.route("/products")
+@cached_page("product")
 def products_page():
-    products = Product.query.order_by(Product.title.asc()).all()
-    return render_template("products.html", products=products)
+    # Satırlar /api/products'tan sayfa sayfa gelir
+    return render_template("products.html")
+
+PRODUCT_SORT = {"title": Product.title, "price": db.func.coalesce(Product.price, 0.0),
+                "stock": db.func.coalesce(Product.stock, 0), "id": Product.id}
+
+@app.route("/api/products")
+@cached_page("product")
+def api_products():
+    """Keyset sayfalı ürün listesi (DataTables server-side uyumlu)."""
+    prm = table_params(request.args, PRODUCT_SORT, "title")
+    filters = []
+    if prm["search"]:
+        q = prm["search"]
+        filters.append(db.or_(Product.title.ilike(f"%{q}%"), Product.barcode.like(f"{q}%")))
+    query = db.session.query(Product.id, Product.source, Product.title, Product.barcode,
+                             Product.price, Product.stock).filter(*filters)
+    rows, nxt = keyset_page(query, PRODUCT_SORT[prm["sort"]], Product.id, prm["desc"],
+                            prm["limit"], prm["cursor"], prm["start"])
+    for r in rows:
+        r["label_url"] = url_for("product_label_pdf", product_id=r["id"])
+        r["edit_url"] = url_for("edit_product_page", product_id=r["id"])
+    total = count_rows(db.session, Product.id)
+    return jsonify({"draw": prm["draw"], "recordsTotal": total,
+                    "recordsFiltered": count_rows(db.session, Product.id, *filters) if filters else total,
+                    "data": rows, "next_cursor": nxt})
 
 @app.route("/products/add", methods=["GET", "POST"])
 def add_product_page():
@@ -194,7 +1012,10 @@ def add_product_page():
         barcode = request.form.get("barcode", "").strip() or generate_internal_barcode()
         p = Product(source="manual", title=title, price=price, stock=stock, barcode=barcode)
         db.session.add(p)
+        db.session.flush()
+        record_stock_moves([(p.id, stock)], "manual")
         db.session.commit()
+        cache_product(p.id, p.title, p.barcode, p.price)
         flash("Ürün eklendi", "success")
         return redirect(url_for("products_page"))
     return render_template("add_product.html")
@@ -203,117 +1024,424 @@ def add_product_page():
 def edit_product_page(product_id):
     p = Product.query.get_or_404(product_id)
     if request.method == "POST":
+        old_stock = p.stock or 0
         p.title = request.form["title"].strip()
         p.price = float(request.form.get("price", 0))
         p.stock = int(request.form.get("stock", 0))
         p.barcode = request.form.get("barcode", "").strip() or p.barcode
+        record_stock_moves([(p.id, p.stock - old_stock)], "edit")
+        queue_shopify_stock(p)
         db.session.commit()
-        adjust_shopify_stock(p)
+        cache_product(p.id, p.title, p.barcode, p.price)
         flash("Güncellendi", "success")
         return redirect(url_for("products_page"))
     return render_template("edit_product.html", p=p)
 
+IMPORT_BATCH = 1000
+
+@app.route("/products/import", methods=["GET", "POST"])
+def import_products_page():
+    """CSV'den toplu ürün ekleme/güncelleme (barkoda göre)."""
+    if request.method == "GET":
+        return render_template("import_products.html")
+    f = request.files.get("file")
+    if not f or not f.filename:
+        flash("CSV dosyası seçin.", "danger")
+        return redirect(url_for("import_products_page"))
+    update_existing = request.form.get("on_existing") == "update"
+
+    rows, errors = read_product_csv(f.stream)
+
+    # Var olan barkodlar: dosyadaki barkodlar için IN sorguları
+    codes = [r["barcode"] for r in rows if r["barcode"]]
+    existing, stock_of = {}, {}
+    for chunk in _chunks(codes, 900):
+        for code, pid, stock in db.session.query(Product.barcode, Product.id, Product.stock)\
+                .filter(Product.barcode.in_(chunk)):
+            existing[code], stock_of[pid] = pid, stock or 0
+
+    inserts, updates, skipped = [], [], 0
+    for r in rows:
+        pid = existing.get(r["barcode"]) if r["barcode"] else None
+        if pid is None:
+            inserts.append(r)
+        elif update_existing:
+            updates.append({"id": pid, "title": r["title"], "price": r["price"], "stock": r["stock"]})
+        else:
+            skipped += 1
+
+    # Barkodsuzlara tek blokta MS barkodu
+    missing = [r for r in inserts if not r["barcode"]]
+    for r, code in zip(missing, allocate_barcodes(len(missing))):
+        r["barcode"] = code
+
+    # Toplu yazımlar flush olayını atlar: katalog sürümü her parti için elle verilir
+    now = datetime.utcnow()
+    for chunk in _chunks(inserts, IMPORT_BATCH):
+        v = next_catalog_version()
+        ids = db.session.scalars(db.insert(Product).returning(Product.id, sort_by_parameter_order=True), [
+            {"source": "manual", "title": r["title"], "barcode": r["barcode"], "price": r["price"],
+             "stock": r["stock"], "created_at": now, "catalog_version": v} for r in chunk]).all()
+        record_stock_moves([(pid, r["stock"]) for pid, r in zip(ids, chunk)], "import", when=now)
+        db.session.commit()
+    for chunk in _chunks(updates, IMPORT_BATCH):
+        v = next_catalog_version()
+        db.session.execute(db.update(Product), [dict(u, catalog_version=v) for u in chunk])
+        moves = []
+        for u in chunk:  # aynı barkod dosyada iki kez geçebilir: fark son değere göre
+            moves.append((u["id"], u["stock"] - stock_of[u["id"]]))
+            stock_of[u["id"]] = u["stock"]
+        record_stock_moves(moves, "import", when=now)
+        # Stoğu değişen Shopify ürünleri için outbox (aynı commit)
+        moved = list({pid for pid, d in moves if d})
+        if moved:
+            queue_shopify_stocks(db.session.query(Product.shopify_inventory_item_id, Product.stock)
+                                 .filter(Product.id.in_(moved), Product.shopify_inventory_item_id.isnot(None)))
+        db.session.commit()
+
+    # Barkod önbelleği + arama index'i
+    changed = len(inserts) + len(updates)
+    if changed > 5000:
+        warm_barcode_cache()
+    elif changed:
+        touched = [r["barcode"] for r in inserts] + [c for c in codes if c in existing and update_existing]
+        for chunk in _chunks(touched, 900):
+            for row in db.session.query(Product.id, Product.title, Product.barcode, Product.price)\
+                    .filter(Product.barcode.in_(chunk)):
+                cache_product(*row)
+
+    flash(f"{len(inserts)} ürün eklendi, {len(updates)} güncellendi, {skipped} atlandı (mevcut barkod), "
+          f"{len(errors)} hatalı satır.", "success" if not errors else "warning")
+    return render_template("import_products.html", errors=errors)
+
+def _chunks(seq, n=500):
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+def upsert_shopify_page(products):
+    """Bir Shopify sayfasını toplu upsert eder: eşleşmeler IN sorgularıyla önceden yüklenir."""
+    rows = []
+    for prod in products:
+        for v in prod.get("variants", []):
+            inv_item = v.get("inventory_item_id")
+            rows.append({
+                "title": f"{prod.get('title')}",
+                "price": float(v.get("price") or 0.0),
+                "stock": int(v.get("inventory_quantity") or 0),
+                "barcode": v.get("barcode") or None,
+                "variant_id": str(v.get("id")),
+                "inv_item": str(inv_item) if inv_item else None,
+            })
+    if not rows:
+        return 0, [], []
+
+    barcodes = list({r["barcode"] for r in rows if r["barcode"]})
+    variant_ids = list({r["variant_id"] for r in rows})
+    by_barcode, by_variant = {}, {}
+    for part in _chunks(barcodes):
+        by_barcode.update((p.barcode, p) for p in Product.query.filter(Product.barcode.in_(part)))
+    for part in _chunks(variant_ids):
+        by_variant.update((p.shopify_variant_id, p) for p in Product.query.filter(Product.shopify_variant_id.in_(part)))
+
+    touched, moves = [], []  # moves: (ürün, stok farkı); yeni ürünlerin id'si flush'ta gelir
+    now = datetime.utcnow()
+    for r in rows:
+        existing = (by_barcode.get(r["barcode"]) if r["barcode"] else None) or by_variant.get(r["variant_id"])
+        if existing:
+            values = {"title": r["title"], "price": r["price"], "stock": r["stock"],
+                      "shopify_variant_id": r["variant_id"],
+                      "shopify_inventory_item_id": r["inv_item"], "source": "shopify"}
+            diff = {k: v for k, v in values.items() if getattr(existing, k) != v}
+            if "stock" in diff:
+                moves.append((existing, r["stock"] - (existing.stock or 0)))
+            if diff:  # değişmeyen varyanta yazma yapılmaz
+                for k, v in diff.items():
+                    setattr(existing, k, v)
+                existing.synced_at = now
+                touched.append(existing)
+        else:
+            existing = Product(source="shopify", title=r["title"], price=r["price"], stock=r["stock"],
+                               barcode=r["barcode"], shopify_variant_id=r["variant_id"],
+                               shopify_inventory_item_id=r["inv_item"], synced_at=now)
+            db.session.add(existing)
+            touched.append(existing)
+            moves.append((existing, r["stock"]))
+        if r["barcode"]:
+            by_barcode[r["barcode"]] = existing
+        by_variant[r["variant_id"]] = existing
+    return len(rows), touched, moves
+
+def _utc_iso(ts):
+    """Shopify updated_at (ofsetli ISO) -> karşılaştırılabilir UTC ISO."""
+    dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if dt.tzinfo:
+        dt = dt.astimezone(timezone.utc)
+    return dt.replace(tzinfo=None).isoformat() + "Z"
+
+def run_shopify_sync(s, progress=None, full=False):
+    """Kataloğu sayfa sayfa çekip yazar; her sayfa ayrı commit (bellek sabit kalır).
+
+    Watermark varsa sadece updated_at >= watermark olan ürünler istenir; tüm sayfalar
+    başarıyla bittiğinde watermark en yeni updated_at'e ilerletilir.
+    """
+    settings_id, shop = s.id, s.shop_url  # s sayfa commit'lerinden sonra ayrılır
+    client = shopify_client(s)
+    params = {}
+    if not full and s.products_synced_at and s.synced_shop == shop:
+        params["updated_at_min"] = s.products_synced_at
+    watermark = s.products_synced_at if params else None
+
+    count = changed = 0
+    for page in client.iter_product_pages(**params):
+        seen, touched, moves = upsert_shopify_page(page)
+        count += seen
+        changed += len(touched)
+        for prod in page:
+            if prod.get("updated_at"):
+                ts = _utc_iso(prod["updated_at"])
+                watermark = max(watermark or ts, ts)
+        db.session.flush()
+        record_stock_moves([(p.id, d) for p, d in moves], "sync")
+        snaps = [(p.id, p.title, p.barcode, p.price) for p in touched]
+        db.session.commit()
+        for snap in snaps:
+            cache_product(*snap)
+        db.session.expunge_all()
+        if progress:
+            progress(count)
+
+    Settings.query.filter_by(id=settings_id).update({"products_synced_at": watermark, "synced_shop": shop})
+    db.session.commit()
+    return {"count": count, "changed": changed, "incremental": bool(params), "watermark": watermark}
+
+@job_handler("shopify_sync")
+def shopify_sync_job(job_id, full=False):
+    s = get_settings()
+    return run_shopify_sync(s, full=full,
+                            progress=lambda n: job_progress(job_id, n, message=f"{n} varyant işlendi"))
+
 @app.route("/products/sync")
 def sync_shopify_products():
     s = get_settings()
     if not (s.shop_url and s.api_token):
         flash("Önce Ayarlar'dan Shopify bilgilerini girin.", "danger")
         return redirect(url_for("products_page"))
-    try:
-        data = fetch_products(s.shop_url, s.api_token)
-        count = 0
-        for prod in data:
-            for v in prod.get("variants", []):
-                title = f"{prod.get('title')}"
-                price = float(v.get("price") or 0.0)
-                stock = int(v.get("inventory_quantity") or 0)
-                barcode = v.get("barcode") or None
-                inv_item = v.get("inventory_item_id")
-                variant_id = v.get("id")
-
-                existing = None
-                if barcode:
-                    existing = Product.query.filter_by(barcode=barcode).first()
-                if not existing and variant_id:
-                    existing = Product.query.filter_by(shopify_variant_id=str(variant_id)).first()
-
-                if existing:
-                    existing.title = title
-                    existing.price = price
-                    existing.stock = stock
-                    existing.shopify_variant_id = str(variant_id)
-                    existing.shopify_inventory_item_id = str(inv_item)
-                    existing.source = "shopify"
-                else:
-                    db.session.add(Product(
-                        source="shopify", title=title, price=price, stock=stock,
-                        barcode=barcode, shopify_variant_id=str(variant_id),
-                        shopify_inventory_item_id=str(inv_item)))
-                count += 1
-        db.session.commit()
-        flash(f"Shopify'dan {count} varyant senkronize edildi.", "success")
-    except Exception as e:
-        flash(f"Senkron hata: {e}", "danger")
-    return redirect(url_for("products_page"))
+    full = request.args.get("full") == "1"  # watermark'ı yok say, tüm kataloğu çek
+    job = submit_job("shopify_sync", full=full)
+    flash("Shopify senkronu arka planda başlatıldı.", "info")
+    return redirect(url_for("products_page", job=job.id))
+
+def reconcile_inventory(progress=None, dry_run=False, batch=50):
+    """Yerel stok ile Shopify lokasyon stoğunu karşılaştırır; farklı olanlara yerel değeri yazar."""
+    s = get_settings()
+    if not (s.shop_url and s.api_token and s.location_id):
+        raise RuntimeError("Shopify ayarları eksik (mağaza, token, lokasyon)")
+    client, location_id = shopify_client(s), s.location_id
+
+    checked = pushed = failed = 0
+    drift = []
+    last_id = 0
+    while True:
+        # Yerel ürünleri id sırasıyla gruplar halinde gez (keyset)
+        rows = db.session.query(Product.id, Product.shopify_inventory_item_id, Product.stock)\
+            .filter(Product.id > last_id, Product.shopify_inventory_item_id.isnot(None))\
+            .order_by(Product.id.asc()).limit(batch).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        local = {r.shopify_inventory_item_id: int(r.stock or 0) for r in rows}
+        remote = {str(lvl["inventory_item_id"]): lvl.get("available")
+                  for lvl in client.iter_inventory_levels(location_id, list(local))}
+        for item_id, qty in local.items():
+            checked += 1
+            if remote.get(item_id) == qty:
+                continue
+            drift.append({"inventory_item_id": item_id, "local": qty, "shopify": remote.get(item_id)})
+            if dry_run:
+                continue
+            try:
+                client.set_inventory(location_id, item_id, qty)
+                pushed += 1
+            except Exception as e:
+                failed += 1
+                log.warning("Shopify stok mutabakat hatası: %s %s", item_id, e)
+        db.session.rollback()  # okuma transaction'ını bırak
+        if progress:
+            progress(checked, len(drift))
+    return {"checked": checked, "drift": len(drift), "pushed": pushed, "failed": failed,
+            "dry_run": dry_run, "samples": drift[:20]}
+
+@job_handler("inventory_reconcile")
+def inventory_reconcile_job(job_id, dry_run=False):
+    return reconcile_inventory(dry_run=dry_run, progress=lambda n, d: job_progress(
+        job_id, n, message=f"{n} ürün kontrol edildi, {d} farklı"))
+
+@app.route("/products/reconcile")
+def reconcile_shopify_inventory():
+    s = get_settings()
+    if not (s.shop_url and s.api_token and s.location_id):
+        flash("Önce Ayarlar'dan Shopify bilgilerini ve lokasyonu girin.", "danger")
+        return redirect(url_for("products_page"))
+    job = submit_job("inventory_reconcile", dry_run=request.args.get("dry_run") == "1")
+    flash("Stok mutabakatı arka planda başlatıldı.", "info")
+    return redirect(url_for("products_page", job=job.id))
+
+def _pdf_response(data, filename):
+    return send_file(BytesIO(data), mimetype="application/pdf", as_attachment=True, download_name=filename)
+
+# Etiketler bellekte üretilir (disk yok); LABEL_STYLE=png eski PNG barkodlu görünümü verir.
+LABEL_STYLE = os.getenv("LABEL_STYLE", "vector")
+label_cache = BytesLRU(max_items=int(os.getenv("LABEL_CACHE_SIZE", "512")),
+                       max_bytes=int(os.getenv("LABEL_CACHE_MB", "32")) * 1024 * 1024)
+
+def render_label(code, title, price):
+    price = float(price or 0.0)
+
+    def render():
+        metrics.inc("labels_rendered_total", kind=LABEL_STYLE)
+        with metrics.timer("label_render_seconds", kind=LABEL_STYLE):
+            if LABEL_STYLE == "png":
+                return label_pdf_png_bytes(code, title, price, code128_png_bytes(code))
+            return label_pdf_bytes(code, title, price)
+    return label_cache.get_or_render((LABEL_STYLE, code, title, price), render)
 
 @app.route("/label/<int:product_id>")
 def product_label_pdf(product_id):
     p = Product.query.get_or_404(product_id)
-    code = p.barcode or generate_internal_barcode()
-    png_path = f"barcodes/{code}.png"
-    pdf_path = f"labels/{code}.pdf"
-    generate_code128_png(code, png_path)
-    path = build_label_pdf(code, p.title, p.price or 0.0, png_path, pdf_path)
-    return send_file(path, as_attachment=True)
+    if not p.barcode:
+        # Etiketteki barkod okutulunca bulunabilsin diye kaydedilir
+        p.barcode = generate_internal_barcode()
+        db.session.commit()
+        cache_product(p.id, p.title, p.barcode, p.price)
+    code = p.barcode
+    return _pdf_response(render_label(code, p.title, p.price), f"{code}.pdf")
 
 @app.route("/label_by_code/<code>")
 def label_by_code(code):
-    p = Product.query.filter_by(barcode=code).first()
+    p = lookup_barcode(code)
     if not p:
         return "Ürün bulunamadı", 404
-    png_path = f"barcodes/{code}.png"
-    pdf_path = f"labels/{code}.pdf"
-    generate_code128_png(code, png_path)
-    path = build_label_pdf(code, p.title, p.price or 0.0, png_path, pdf_path)
-    return send_file(path, as_attachment=True)
+    return _pdf_response(render_label(code, p.title, p.price), f"{code}.pdf")
+
+@app.route("/api/products/search")
+def api_product_search():
+    """Ad/barkod önek araması (süreç içi index); stok sonuç satırları için tek sorguyla eklenir."""
+    q = (request.args.get("q") or "").strip()
+    limit = max(1, min(int(request.args.get("limit") or 20), 100))
+    sync_product_caches()
+    hits = product_index.search(q, limit) if q else []
+    if q and not hits:
+        # Başka worker'da yeni eklenmiş olabilir: DB'ye düş, bulunanı index'e ekle
+        hits = db.session.query(Product.id, Product.title, Product.barcode, Product.price)\
+            .filter(db.or_(Product.barcode == q, Product.title.ilike(f"%{q}%"))).limit(limit).all()
+        for h in hits:
+            product_index.put(*h)
+    stock = dict(db.session.query(Product.id, Product.stock)
+                 .filter(Product.id.in_([h[0] for h in hits])).all()) if hits else {}
+    return jsonify([{"id": pid, "title": title, "barcode": barcode, "price": price, "stock": stock.get(pid)}
+                    for pid, title, barcode, price in hits])
+
+LABEL_LAYOUTS = {"3x8": (3, 8), "2x5": (2, 5), "4x10": (4, 10)}
+LABEL_BATCH_MAX = 5000  # istek başına toplam etiket (ürün × kopya)
+LABEL_BATCH_SYNC = int(os.getenv("LABEL_BATCH_SYNC", "1000"))  # üstü arka plan işinde basılır
+
+def _label_sheet(items, cols, rows):
+    metrics.inc("labels_rendered_total", len(items), kind="sheet")
+    with metrics.timer("label_render_seconds", kind="sheet"):
+        return label_sheet_pdf(items, cols=cols, rows=rows)
+
+@job_handler("label_batch")
+def label_batch_job(job_id, product_ids, cols, rows, copies):
+    products = []
+    for part in _chunks(product_ids, 900):
+        products += db.session.query(Product.barcode, Product.title, Product.price)\
+            .filter(Product.id.in_(part), Product.barcode.isnot(None)).all()
+    products.sort(key=lambda r: r.title or "")
+    items = [(b, t, float(p or 0)) for b, t, p in products for _ in range(copies)]
+    job_progress(job_id, 0, total=len(items), message=f"{len(items)} etiket hazırlanıyor")
+    pdf = _label_sheet(items, cols, rows)
+    db.session.query(Job).filter_by(id=job_id).update({"output": pdf}, synchronize_session=False)
+    db.session.commit()
+    job_progress(job_id, len(items), message=f"{len(items)} etiket hazır")
+    return {"labels": len(items), "file": f"etiketler-{datetime.utcnow():%Y%m%d-%H%M}.pdf"}
+
+@app.route("/labels/batch", methods=["POST"])
+def label_batch_pdf():
+    """Seçili ürünler veya bir tarihten beri eklenen/senkronlanan ürünler için çok sayfalı etiket PDF'i."""
+    ids = [int(x) for x in request.form.getlist("product_ids") if x.isdigit()]
+    since = (request.form.get("since") or "").strip()
+    cols, rows = LABEL_LAYOUTS.get(request.form.get("layout"), LABEL_LAYOUTS["3x8"])
+    try:
+        copies = max(1, min(int(request.form.get("copies") or 1), 50))
+    except ValueError:
+        copies = 1
+
+    q = db.session.query(Product.barcode, Product.title, Product.price, Product.id)\
+        .filter(Product.barcode.isnot(None))
+    if ids:
+        q = q.filter(Product.id.in_(ids))
+    elif since:
+        try:
+            since_dt = datetime.strptime(since, "%Y-%m-%d")
+        except ValueError:
+            flash("Geçersiz tarih", "danger")
+            return redirect(url_for("products_page"))
+        q = q.filter(db.or_(Product.synced_at >= since_dt, Product.created_at >= since_dt))
+    else:
+        flash("Ürün seçin veya bir tarih girin.", "danger")
+        return redirect(url_for("products_page"))
+
+    max_products = LABEL_BATCH_MAX // copies
+    products = q.order_by(Product.title.asc()).limit(max_products + 1).all()
+    if not products:
+        flash("Etiket basılacak (barkodlu) ürün bulunamadı.", "warning")
+        return redirect(url_for("products_page"))
+    if len(products) > max_products:
+        flash(f"En fazla {LABEL_BATCH_MAX} etiket basılabilir ({copies} kopya ile {max_products} ürün). "
+              "Seçimi daraltın veya kopya sayısını azaltın.", "danger")
+        return redirect(url_for("products_page"))
+    if len(products) * copies > LABEL_BATCH_SYNC:
+        job = submit_job("label_batch", product_ids=[r.id for r in products], cols=cols, rows=rows, copies=copies)
+        flash(f"{len(products) * copies} etiket arka planda hazırlanıyor; bitince indirme bağlantısı çıkacak.", "info")
+        return redirect(url_for("products_page", job=job.id))
+    items = [(b, t, float(p or 0)) for b, t, p, _ in products for _ in range(copies)]
+    return _pdf_response(_label_sheet(items, cols, rows), f"etiketler-{datetime.utcnow():%Y%m%d-%H%M}.pdf")
 
 # ---- Sales (AJAX Sepet)
 @app.route("/sales", methods=["GET"])
 def sales_page():
-    customers = Customer.query.order_by(Customer.name.asc()).all()
+    if request.args.get("cart"):
+        session["cart_id"] = request.args["cart"][:32]  # başka terminalin sepetine katıl
+    cart = get_cart()
     return render_template("sales.html",
-                           customers=customers,
-                           cart=get_cart(),
-                           totals=cart_totals(get_cart()))
+                           cart=cart,
+                           cart_id=current_cart_id(),
+                           shared=bool(request.args.get("cart")),
+                           totals=cart_totals(cart))
 
+# Sepet API'leri sadece değişen satırı + toplamları döner
 @app.post("/api/cart/add")
 def api_cart_add():
     data = request.get_json(force=True)
     barcode = (data.get("barcode") or "").strip()
     qty = int(data.get("qty") or 1)
 
-    prod = Product.query.filter_by(barcode=barcode).first()
+    prod = lookup_barcode(barcode)
     if not prod:
         return jsonify({"ok": False, "message": "Barkod bulunamadı"}), 404
     if qty < 1:
         qty = 1
 
-    cart = get_cart()
-    for item in cart:
-        if item["product_id"] == prod.id:
-            item["qty"] += qty
-            save_cart(cart)
-            return jsonify({"ok": True, "cart": cart, "totals": cart_totals(cart)})
-
-    cart.append({
+    cid = current_cart_id()
+    line = cart_store.add(cid, {
         "product_id": prod.id,
         "title": prod.title,
         "barcode": prod.barcode,
-        "price": float(prod.price or 0),
-        "qty": qty
-    })
-    save_cart(cart)
-    return jsonify({"ok": True, "cart": cart, "totals": cart_totals(cart)})
+        "price": prod.price,
+    }, qty)
+    totals = cart_store.totals(cid)
+    db.session.commit()
+    return jsonify({"ok": True, "line": line, "totals": totals})
 
 @app.post("/api/cart/update")
 def api_cart_update():
@@ -321,28 +1449,31 @@ def api_cart_update():
     pid = int(data.get("product_id"))
     qty = int(data.get("qty"))
 
-    cart = get_cart()
-    for item in cart:
-        if item["product_id"] == pid:
-            if qty <= 0:
-                cart = [i for i in cart if i["product_id"] != pid]
-            else:
-                item["qty"] = qty
-            save_cart(cart)
-            return jsonify({"ok": True, "cart": cart, "totals": cart_totals(cart)})
-    return jsonify({"ok": False, "message": "Ürün sepette yok"}), 404
+    cid = current_cart_id()
+    try:
+        line = cart_store.set_qty(cid, pid, qty)
+    except KeyError:
+        return jsonify({"ok": False, "message": "Ürün sepette yok"}), 404
+    totals = cart_store.totals(cid)
+    db.session.commit()
+    if line is None:
+        return jsonify({"ok": True, "removed": pid, "totals": totals})
+    return jsonify({"ok": True, "line": line, "totals": totals})
 
 @app.post("/api/cart/remove")
 def api_cart_remove():
     data = request.get_json(force=True)
     pid = int(data.get("product_id"))
-    cart = [i for i in get_cart() if i["product_id"] != pid]
-    save_cart(cart)
-    return jsonify({"ok": True, "cart": cart, "totals": cart_totals(cart)})
+    cid = current_cart_id()
+    cart_store.remove(cid, pid)
+    totals = cart_store.totals(cid)
+    db.session.commit()
+    return jsonify({"ok": True, "removed": pid, "totals": totals})
 
 @app.post("/api/cart/clear")
 def api_cart_clear():
-    save_cart([])
+    cart_store.clear(current_cart_id())
+    db.session.commit()
     return jsonify({"ok": True, "cart": [], "totals": {"qty": 0, "amount": 0}})
 
 @app.post("/api/cart/checkout")
@@ -350,7 +1481,7 @@ def api_cart_checkout():
     data = request.get_json(force=True)
     payment = (data.get("payment") or "nakit").strip()   # nakit/kart/veresiye
     cust_id = data.get("customer_id")
-    customer = Customer.query.get(cust_id) if cust_id else None
+    customer = db.session.get(Customer, cust_id) if cust_id else None
 
     disc_type = (data.get("discount_type") or "none").strip()   # none/percent/amount
     try:
@@ -358,14 +1489,45 @@ def api_cart_checkout():
     except:
         disc_value = 0.0
 
-    cart = get_cart()
+    # items verilirse (POS yerel sepeti) sunucu sepeti kullanılmaz
+    cid = current_cart_id()
+    items = data.get("items")
+    server_cart = items is None
+    if not server_cart:
+        try:
+            cart = _cart_from_items(items)
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({"ok": False, "message": f"Geçersiz sepet: {e}"}), 400
+    else:
+        # Sepeti fiyatlamadan önce sahiplen: paylaşılan sepette (X-Cart-Id) ikinci checkout boş görür.
+        # DB store'da silme satışla aynı transaction'da; hata/rollback sepeti geri getirir.
+        cart = cart_store.take(cid)
     if not cart:
         return jsonify({"ok": False, "message": "Sepet boş"}), 400
 
-    # 1) Ara toplam
+    # 1) Ürünleri tek IN sorgusuyla kilitle (Postgres: SELECT ... FOR UPDATE, id sırasıyla)
+    qty_by_pid = {}
+    for item in cart:
+        qty_by_pid[item["product_id"]] = qty_by_pid.get(item["product_id"], 0) + int(item["qty"])
+    pids = sorted(qty_by_pid)
+    locked = {r.id: r for r in db.session.query(Product.id, Product.title, Product.price)
+              .filter(Product.id.in_(pids)).order_by(Product.id).with_for_update()}
+    repriced = []
+    for item in cart:
+        row = locked.get(item["product_id"])
+        if row is None:
+            if server_cart and not cart_store.transactional:
+                for line in cart:
+                    cart_store.add(cid, line, int(line["qty"]))  # bellek store'u: sepeti geri koy
+            return jsonify({"ok": False, "message": f"Ürün bulunamadı: {item.get('title') or item['product_id']}"}), 400
+        # Fiyat her zaman kilitli satırdan: sepet/istemci fiyatı eskimiş olabilir
+        price = float(row.price or 0)
+        if item.get("price") is not None and round(float(item["price"]), 2) != round(price, 2):
+            repriced.append({"product_id": row.id, "title": row.title, "price": price})
+        item.update(title=row.title, price=price)
+
+    # 2) Ara toplam + indirim
     subtotal = sum(float(i["price"]) * int(i["qty"]) for i in cart)
-
-    # 2) İndirim
     discount = 0.0
     if disc_type == "percent":
         p = min(max(disc_value, 0), 100)      # 0–100 arası
@@ -376,52 +1538,200 @@ def api_cart_checkout():
     grand_total = round(subtotal - discount, 2)
     factor = (grand_total / subtotal) if subtotal > 0 else 1.0  # Ürünlere oransal dağıt
 
-    # 3) Satış kalemlerini kaydet + stok düş
-    for item in cart:
-        prod = Product.query.get(item["product_id"])
-        if not prod:
-            return jsonify({"ok": False, "message": f"Ürün bulunamadı: {item.get('title')}"}), 400
-
-        qty = int(item["qty"])
-        unit_price = float(item["price"])
-        line_total = round(unit_price * qty * factor, 2)  # indirim dağıtılmış tutar
-
-        sale = Sale(customer_id=customer.id if customer else None,
-                    product_id=prod.id,
-                    qty=qty,
-                    unit_price=unit_price,         # etiket fiyatı
-                    total_price=line_total,        # indirimli satır toplamı
-                    payment=payment,
-                    is_paid=(payment != "veresiye"))
-        db.session.add(sale)
-
-        prod.stock = (prod.stock or 0) - qty
-        db.session.flush()
-        try:
-            adjust_shopify_stock(prod)
-        except Exception as e:
-            print("Shopify sync error:", e)
-
-    # 4) Veresiye borcu
+    # 3) Stok düş: stock = stock - :qty (okuma-değiştirme-yazma yok, eşzamanlı satışta kayıp olmaz)
+    t = Product.__table__
+    db.session.execute(
+        t.update().where(t.c.id == db.bindparam("pid"))
+         .values(stock=db.func.coalesce(t.c.stock, 0) - db.bindparam("dq")),
+        [{"pid": pid, "dq": q} for pid, q in qty_by_pid.items()])
+
+    # 4) Fiş başlığı + satış kalemleri (toplu)
+    now = datetime.utcnow()
+    order = Order(created_at=now, customer_id=customer.id if customer else None,
+                  payment=payment, is_paid=(payment != "veresiye"),
+                  subtotal=round(subtotal, 2), discount=round(discount, 2), total=grand_total,
+                  item_count=sum(qty_by_pid.values()), line_count=len(cart))
+    db.session.add(order)
+    db.session.flush()
+    db.session.execute(db.insert(Sale), [{
+        "created_at": now,
+        "order_id": order.id,
+        "customer_id": customer.id if customer else None,
+        "product_id": item["product_id"],
+        "qty": int(item["qty"]),
+        "unit_price": float(item["price"]),                                        # etiket fiyatı
+        "total_price": round(float(item["price"]) * int(item["qty"]) * factor, 2),  # indirimli satır toplamı
+        "payment": payment,
+        "is_paid": payment != "veresiye",
+    } for item in cart])
+    record_stock_moves([(pid, -q) for pid, q in qty_by_pid.items()], "sale", ref_id=order.id, when=now)
+
+    # Shopify'a güncel stoklar (outbox, aynı transaction)
+    queue_shopify_stocks(db.session.query(Product.shopify_inventory_item_id, Product.stock)
+                         .filter(Product.id.in_(pids), Product.shopify_inventory_item_id.isnot(None)))
+
+    # 5) Veresiye borcu (atomik)
     if payment == "veresiye" and customer:
-        customer.debt = (customer.debt or 0.0) + grand_total
+        db.session.execute(db.update(Customer).where(Customer.id == customer.id)
+                           .values(debt=db.func.coalesce(Customer.debt, 0.0) + grand_total))
+
+    # 6) Günlük özet
+    bump_summary(payment, revenue=grand_total, qty=order.item_count)
 
     db.session.commit()
-    save_cart([])
 
     return jsonify({
         "ok": True,
         "message": "Satış tamamlandı",
+        "order_id": order.id,
         "subtotal": round(subtotal, 2),
         "discount": round(discount, 2),
-        "total": round(grand_total, 2)
+        "total": round(grand_total, 2),
+        "repriced": repriced,
+    })
+
+def _cart_from_items(items):
+    """[{product_id|barcode, qty, price?}] -> sepet satırları (aynı ürün birleşir; fiyat kilitte DB'den)."""
+    if not isinstance(items, list):
+        raise TypeError("items liste olmalı")
+    lines = {}
+    for it in items:
+        if not isinstance(it, dict):
+            raise TypeError(f"satır nesne olmalı ({it!r:.40})")
+        qty = int(it.get("qty") or 1)
+        if qty < 1:
+            continue
+        pid = it.get("product_id")
+        if pid is None:
+            snap = lookup_barcode(str(it.get("barcode") or "").strip())
+            if not snap:
+                raise ValueError(f"barkod bulunamadı ({it.get('barcode')})")
+            pid = snap.id
+        pid = int(pid)
+        price = it.get("price")
+        line = lines.setdefault(pid, {"product_id": pid, "qty": 0, "title": None,
+                                      "price": float(price) if price is not None else None})
+        line["qty"] += qty
+    return list(lines.values())
+
+# ---- POS katalog: sürümlü anlık görüntü + değişiklik akışı
+CATALOG_CHANGES_MAX = 5000
+_catalog_snapshots = BytesLRU(max_items=4, max_bytes=64 * 1024 * 1024)
+
+def _compact_json(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+@app.route("/api/catalog")
+def api_catalog():
+    """Barkodlu tüm ürünler [id, barkod, ad, fiyat]; ETag = sürüm, gzip destekli."""
+    version = catalog_version()  # satırlardan önce okunur: arada gelen değişiklik delta'da görünür
+    etag = f'"catalog-{version}"'
+    if request.if_none_match.contains(etag.strip('"')):
+        return Response(status=304, headers={"ETag": etag})
+    gz = "gzip" in (request.headers.get("Accept-Encoding") or "")
+
+    def build():
+        rows = db.session.query(Product.id, Product.barcode, Product.title, Product.price)\
+            .filter(Product.barcode.isnot(None)).order_by(Product.id).yield_per(5000)
+        return _compact_json({"version": version, "fields": ["id", "barcode", "title", "price"],
+                              "items": [[r.id, r.barcode, r.title, float(r.price or 0)] for r in rows]})
+
+    body = _catalog_snapshots.get_or_render((version, False), build)
+    if gz:
+        body = _catalog_snapshots.get_or_render((version, True), lambda: gzip.compress(body, 6))
+    resp = Response(body, mimetype="application/json")
+    resp.headers.update({"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"})
+    if gz:
+        resp.headers["Content-Encoding"] = "gzip"
+    return resp
+
+@app.route("/api/catalog/changes")
+def api_catalog_changes():
+    """since sürümünden sonra değişen ürünler; barkodu boş olan satır POS'ta silinir.
+    reset=true ise istemci anlık görüntüyü yeniden çekmeli."""
+    since = request.args.get("since", type=int)
+    version = catalog_version()
+    if since is None or since > version:
+        return jsonify({"version": version, "reset": True, "items": []})
+    rows = db.session.query(Product.id, Product.barcode, Product.title, Product.price)\
+        .filter(Product.catalog_version > since).order_by(Product.catalog_version, Product.id)\
+        .limit(CATALOG_CHANGES_MAX + 1).all()
+    if len(rows) > CATALOG_CHANGES_MAX:
+        return jsonify({"version": version, "reset": True, "items": []})
+    return jsonify({"version": version, "reset": False,
+                    "items": [[r.id, r.barcode, r.title, float(r.price or 0)] for r in rows]})
+
+# ---- Fiş (yeniden basım / iade araması)
+@app.route("/api/orders/<int:order_id>")
+def order_detail(order_id):
+    o = db.session.get(Order, order_id)
+    if not o:
+        return jsonify({"ok": False, "message": "Fiş bulunamadı"}), 404
+    lines = db.session.query(Sale.product_id, Product.title, Product.barcode, Sale.qty,
+                             Sale.unit_price, Sale.total_price)\
+        .join(Product, Product.id == Sale.product_id)\
+        .filter(Sale.order_id == o.id).order_by(Sale.id).all()
+    return jsonify({
+        "ok": True,
+        "order": {"id": o.id, "created_at": o.created_at.isoformat(), "customer_id": o.customer_id,
+                  "payment": o.payment, "subtotal": o.subtotal, "discount": o.discount,
+                  "total": o.total, "item_count": o.item_count},
+        "lines": [{"product_id": l.product_id, "title": l.title, "barcode": l.barcode, "qty": l.qty,
+                   "unit_price": l.unit_price, "total": l.total_price} for l in lines],
     })
 
 # ---- Customers
 @app.route("/customers")
 def customers_page():
-    customers = Customer.query.order_by(Customer.name.asc()).all()
-    return render_template("customers.html", customers=customers)
+    return render_template("customers.html")
+
+CUSTOMER_SORT = {"name": Customer.name, "debt": db.func.coalesce(Customer.debt, 0.0), "id": Customer.id}
+
+@app.route("/api/customers")
+@cached_page("customer")
+def api_customers():
+    """Keyset sayfalı müşteri listesi; ?debtors=1 sadece borçlular (veresiye sayfası)."""
+    prm = table_params(request.args, CUSTOMER_SORT, "name")
+    filters = []
+    if request.args.get("debtors"):
+        filters.append(Customer.debt > 0)
+    if prm["search"]:
+        q = prm["search"]
+        filters.append(db.or_(Customer.name.ilike(f"%{q}%"), Customer.phone.like(f"%{q}%")))
+    query = db.session.query(Customer.id, Customer.name, Customer.phone, Customer.email,
+                             Customer.debt).filter(*filters)
+    rows, nxt = keyset_page(query, CUSTOMER_SORT[prm["sort"]], Customer.id, prm["desc"],
+                            prm["limit"], prm["cursor"], prm["start"])
+    for r in rows:
+        r["url"] = url_for("customer_detail", customer_id=r["id"])
+    base = [Customer.debt > 0] if request.args.get("debtors") else []
+    return jsonify({"draw": prm["draw"], "recordsTotal": count_rows(db.session, Customer.id, *base),
+                    "recordsFiltered": count_rows(db.session, Customer.id, *filters),
+                    "data": rows, "next_cursor": nxt})
+
+@app.route("/api/customers/search")
+def api_customer_search():
+    """Ad veya telefon önekine göre ilk N müşteri (indexli aralık sorgusu)."""
+    q = (request.args.get("q") or "").strip()
+    limit = max(1, min(int(request.args.get("limit") or 10), 50))
+    if not q:
+        return jsonify([])
+    cols = (Customer.id, Customer.name, Customer.phone, Customer.debt)
+    if looks_like_phone(q):
+        key = phone_key(q)
+        rows = db.session.query(*cols).filter(prefix_range(Customer.phone_key, key))\
+            .order_by(Customer.phone_key).limit(limit).all() if key else []
+    else:
+        key = tr_fold(q)
+        rows = db.session.query(*cols).filter(prefix_range(Customer.search_key, key))\
+            .order_by(Customer.search_key).limit(limit).all()
+        if len(rows) < limit and key:
+            # Soyad vb. sonraki kelimelerde önek (index'siz, sadece eksik kalırsa)
+            rows += db.session.query(*cols).filter(Customer.search_key.like(f"% {key}%"),
+                                                   Customer.id.notin_([r.id for r in rows]))\
+                .order_by(Customer.search_key).limit(limit - len(rows)).all()
+    return jsonify([{"id": r.id, "name": r.name, "phone": r.phone, "debt": round(r.debt or 0, 2)}
+                    for r in rows])
 
 @app.route("/customers/add", methods=["GET", "POST"])
 def add_customer_page():
@@ -443,8 +1753,8 @@ def customer_detail(customer_id):
     year_ago = datetime.utcnow() - timedelta(days=365)
 
     rows = db.session.execute(db.text("""
-        SELECT s.created_at as date, p.title as product_name, s.qty as qty,
-               s.total_price as total, s.payment as payment
+        SELECT s.created_at as date, s.order_id as order_id, p.title as product_name,
+               s.qty as qty, s.total_price as total, s.payment as payment
         FROM sale s
         JOIN product p ON p.id = s.product_id
         WHERE s.customer_id = :cid AND s.created_at >= :d
@@ -461,6 +1771,7 @@ def customer_detail(customer_id):
             d_str = str(d)  # ISO string ise direkt
         sales.append({
             "date_str": d_str,
+            "order_id": r["order_id"],
             "product_name": r["product_name"],
             "qty": r["qty"],
             "total": r["total"],
@@ -480,6 +1791,7 @@ def collect_credit(customer_id):
         amount = c.debt or 0.0
     c.debt = (c.debt or 0.0) - amount
     db.session.add(CreditPayment(customer_id=c.id, amount=amount))
+    bump_summary("tahsilat", collections=amount)
     db.session.commit()
     flash("Tahsilat kaydedildi (ciroya eklendi)", "success")
     return redirect(url_for("customer_detail", customer_id=c.id))
@@ -502,18 +1814,16 @@ def returns_page():
             qty = 1
 
         # Eski ürünü bul
-        old_p = Product.query.filter_by(barcode=old_barcode).first()
+        snap = lookup_barcode(old_barcode)
+        old_p = db.session.get(Product, snap.id) if snap else None
         if not old_p:
             flash("Eski ürün barkodu bulunamadı.", "danger")
             return redirect(url_for('returns_page'))
 
         # 1) Stok: iade edilen eski ürün stoğa geri eklenir
         old_p.stock = (old_p.stock or 0) + qty
-        try:
-            # Shopify stoğunu da güncelle (varsa yardımcı fonksiyon)
-            adjust_shopify_stock(old_p)
-        except Exception:
-            pass
+        queue_shopify_stock(old_p)  # Shopify stoğu arka planda güncellenir
+        moves = [(old_p.id, qty, "return")]
 
         # 2) Değişim ise yeni ürünü bul ve stoktan düş
         new_p = None
@@ -521,16 +1831,15 @@ def returns_page():
             if not new_barcode:
                 flash("Değişim için yeni ürün barkodu gerekli.", "danger")
                 return redirect(url_for('returns_page'))
-            new_p = Product.query.filter_by(barcode=new_barcode).first()
+            snap = lookup_barcode(new_barcode)
+            new_p = db.session.get(Product, snap.id) if snap else None
             if not new_p:
                 flash("Yeni ürün barkodu bulunamadı.", "danger")
                 return redirect(url_for('returns_page'))
 
             new_p.stock = (new_p.stock or 0) - qty
-            try:
-                adjust_shopify_stock(new_p)
-            except Exception:
-                pass
+            queue_shopify_stock(new_p)
+            moves.append((new_p.id, -qty, "exchange"))
 
         # 3) İşlemi kayıt altına al (model varsa)
         try:
@@ -549,64 +1858,335 @@ def returns_page():
             # ReturnExchange modeli yoksa sadece stok güncellenmiş olur—devam.
             pass
 
+        db.session.flush()
+        for pid, d, reason in moves:
+            record_stock_moves([(pid, d)], reason, ref_id=re.id)
+        bump_summary("iade", returns=qty)
         db.session.commit()
         flash("İade/Değişim işlemi başarıyla kaydedildi.", "success")
         return redirect(url_for('returns_page'))
 
-    # GET: müşteri listesini gönder
-    customers = Customer.query.order_by(Customer.name.asc()).all()
-    return render_template('returns.html', customers=customers)
+    # GET: müşteri seçimi /api/customers/search ile yapılır
+    return render_template('returns.html')
 
 # ---- Reports
 @app.route("/reports")
+@cached_page("daily_summary", "orders", daily=True)
 def reports_page():
     today = datetime.utcnow().date()
-    month_start = datetime(today.year, today.month, 1)
-
-    today_total_sales = db.session.query(db.func.coalesce(db.func.sum(Sale.total_price), 0))\
-        .filter(Sale.is_paid == True, db.func.date(Sale.created_at) == today).scalar()
-    today_collections = db.session.query(db.func.coalesce(db.func.sum(CreditPayment.amount), 0))\
-        .filter(db.func.date(CreditPayment.created_at) == today).scalar()
-    month_total_sales = db.session.query(db.func.coalesce(db.func.sum(Sale.total_price), 0))\
-        .filter(Sale.is_paid == True, Sale.created_at >= month_start).scalar()
-    month_collections = db.session.query(db.func.coalesce(db.func.sum(CreditPayment.amount), 0))\
-        .filter(CreditPayment.created_at >= month_start).scalar()
-
-    kpis = {"today": float(today_total_sales) + float(today_collections),
-            "month": float(month_total_sales) + float(month_collections),
-            "collections": float(month_collections)}
-
-    labels, values = [], []
-    d = month_start
-    while d.month == month_start.month:
-        day_sales = db.session.query(db.func.coalesce(db.func.sum(Sale.total_price), 0))\
-            .filter(Sale.is_paid == True, db.func.date(Sale.created_at) == d.date()).scalar()
-        day_col = db.session.query(db.func.coalesce(db.func.sum(CreditPayment.amount), 0))\
-            .filter(db.func.date(CreditPayment.created_at) == d.date()).scalar()
-        labels.append(d.strftime("%d.%m"))
-        values.append(float(day_sales) + float(day_col))
-        d += timedelta(days=1)
-
-    pay_labels = ["nakit", "kart", "veresiye"]
-    pay_values = []
-    for p in pay_labels:
-        if p == "veresiye":
-            v = db.session.query(db.func.coalesce(db.func.sum(Sale.total_price), 0))\
-                .filter(Sale.payment == "veresiye").scalar()
-        else:
-            v = db.session.query(db.func.coalesce(db.func.sum(Sale.total_price), 0))\
-                .filter(Sale.payment == p, Sale.is_paid == True).scalar()
-        pay_values.append(float(v))
+    month_start = today.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+    sales, collections, pay_values = summary_report(month_start, month_end)
+
+    kpis = {"today": range_total(today, today, sales, collections),
+            "month": range_total(month_start, month_end, sales, collections),
+            "collections": range_total(month_start, month_end, collections),
+            **basket_stats(month_start, month_end)}
+
+    labels, values = series(month_start, month_end, sales, collections)
+    pay_labels = PAY_LABELS
 
     charts = {"month": {"labels": labels, "values": values},
               "pay": {"labels": pay_labels, "values": pay_values}}
     return render_template("reports.html", kpis=kpis, charts=charts)
 
+# ---- CSV dışa aktarım (akışlı; sunucu tarafı cursor, sabit bellek)
+EXPORT_BATCH = 1000
+
+def _export_range():
+    today = datetime.utcnow().date()
+    try:
+        first = datetime.strptime(request.args["start"], "%Y-%m-%d").date() if request.args.get("start") \
+            else today.replace(day=1)
+        last = datetime.strptime(request.args["end"], "%Y-%m-%d").date() if request.args.get("end") else today
+    except ValueError:
+        return None
+    return first, last
+
+def _stream_rows(stmt):
+    # yield_per: ORM satırları parti parti; stream_results: Postgres'te server-side cursor
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH, stream_results=True))
+    for part in result.partitions():
+        yield from part
+
+def _csv_response(filename, header, stmt):
+    resp = Response(stream_with_context(csv_chunks(header, _stream_rows(stmt))),
+                    mimetype="text/csv; charset=utf-8")
+    resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return resp
+
+@app.route("/export/sales.csv")
+def export_sales():
+    rng = _export_range()
+    if not rng:
+        return "Geçersiz tarih (YYYY-MM-DD)", 400
+    start, end = day_bounds(*rng)
+    stmt = db.select(Sale.created_at, Sale.order_id, Product.barcode, Product.title, Sale.qty,
+                     Sale.unit_price, Sale.total_price, Sale.payment, Sale.is_paid, Customer.name)\
+        .outerjoin(Product, Product.id == Sale.product_id)\
+        .outerjoin(Customer, Customer.id == Sale.customer_id)\
+        .where(Sale.created_at >= start, Sale.created_at < end)\
+        .order_by(Sale.created_at, Sale.id)
+    header = ["Tarih", "Fiş", "Barkod", "Ürün", "Adet", "Birim Fiyat", "Tutar", "Ödeme", "Ödendi", "Müşteri"]
+    return _csv_response(f"satislar-{rng[0]}-{rng[1]}.csv", header, stmt)
+
+@app.route("/export/customers.csv")
+def export_customers():
+    stmt = db.select(Customer.id, Customer.name, Customer.phone, Customer.email, Customer.debt,
+                     Customer.created_at).order_by(Customer.id)
+    return _csv_response("musteriler.csv", ["ID", "Ad", "Telefon", "E-posta", "Borç", "Kayıt"], stmt)
+
+@app.route("/export/stock.csv")
+def export_stock():
+    stmt = db.select(Product.id, Product.source, Product.barcode, Product.title, Product.price,
+                     Product.stock).order_by(Product.title, Product.id)
+    return _csv_response(f"stok-{datetime.utcnow():%Y%m%d}.csv",
+                         ["ID", "Kaynak", "Barkod", "Ürün", "Fiyat", "Stok"], stmt)
+
+# ---- Stok defteri: kontrol noktaları, geçmiş tarihli stok, satış hızı
+# Bir andaki stok = o andan önceki son kontrol noktası + aradaki hareketler; tarama
+# kontrol noktası aralığıyla sınırlı kalır. Noktalar `flask stock-snapshot` ile (cron) alınır;
+# ilk çalıştırma her ürün için açılış noktası yazar.
+SNAPSHOT_BATCH = 5000
+SALE_REASONS = ("sale", "return", "exchange")  # tezgâhtan net çıkış; diğerleri giriş/düzeltme
+
+def _last_snapshots(before=None):
+    """Ürün başına (before'dan önceki) son kontrol noktası: alt sorgu (product_id, taken_at, stock)."""
+    q = db.select(StockSnapshot.product_id, db.func.max(StockSnapshot.taken_at).label("taken_at"))
+    if before is not None:
+        q = q.where(StockSnapshot.taken_at < before)
+    last = q.group_by(StockSnapshot.product_id).subquery()
+    return db.select(StockSnapshot.product_id, StockSnapshot.taken_at, StockSnapshot.stock)\
+        .join(last, db.and_(StockSnapshot.product_id == last.c.product_id,
+                            StockSnapshot.taken_at == last.c.taken_at)).subquery()
+
+def _moves_after(snaps, before):
+    """Her ürünün kendi kontrol noktasından before'a kadarki hareket toplamı: (product_id, moved)."""
+    m = StockMovement
+    return db.select(m.product_id, db.func.sum(m.delta).label("moved"))\
+        .join(snaps, db.and_(snaps.c.product_id == m.product_id, m.created_at > snaps.c.taken_at))\
+        .where(m.created_at < before).group_by(m.product_id).subquery()
+
+def take_stock_snapshot():
+    """Stoğu son noktadan farklı (veya hiç noktası olmayan) ürünlere kontrol noktası yazar.
+    Defterle tutmayan ürünler drift ile işaretlenir; {"written", "drifted", "drift": [...]} döner."""
+    now = datetime.utcnow()
+    snaps = _last_snapshots()
+    moved = _moves_after(snaps, now)
+    q = db.session.query(Product.id, db.func.coalesce(Product.stock, 0), snaps.c.stock,
+                         db.func.coalesce(moved.c.moved, 0))\
+        .outerjoin(snaps, snaps.c.product_id == Product.id)\
+        .outerjoin(moved, moved.c.product_id == Product.id)
+    rows, drift = [], []
+    for pid, stock, last, mv in q.yield_per(SNAPSHOT_BATCH):
+        if last is None:
+            rows.append((pid, stock, None))
+            continue
+        d = stock - (last + mv)
+        if d:
+            drift.append({"product_id": pid, "stock": stock, "expected": last + mv, "drift": d})
+        if d or stock != last:
+            rows.append((pid, stock, d))
+    for chunk in _chunks(rows, SNAPSHOT_BATCH):
+        db.session.execute(db.insert(StockSnapshot), [
+            {"taken_at": now, "product_id": pid, "stock": st, "drift": d} for pid, st, d in chunk])
+        db.session.commit()
+    if drift:
+        log.warning("Stok defteri tutmuyor: %d üründe drift (ör. #%s: %+d)",
+                    len(drift), drift[0]["product_id"], drift[0]["drift"])
+    return {"written": len(rows), "drifted": len(drift), "drift": drift[:50]}
+
+def stock_as_of(at, product_ids=None):
+    """{product_id: stok} — at anından hemen önceki stok. Kontrol noktası olan ürünlerde
+    nokta + sonraki hareketler; olmayanlarda güncel stoktan at sonrası hareketler düşülür."""
+    snaps = _last_snapshots(at)
+    moved = _moves_after(snaps, at)
+    fwd = db.session.query(snaps.c.product_id, snaps.c.stock + db.func.coalesce(moved.c.moved, 0))\
+        .outerjoin(moved, moved.c.product_id == snaps.c.product_id)
+    if product_ids:
+        fwd = fwd.filter(snaps.c.product_id.in_(product_ids))
+    out = dict(fwd.all())
+
+    m = StockMovement
+    has_snap = db.select(snaps.c.product_id)
+    later = db.select(m.product_id, db.func.sum(m.delta).label("moved"))\
+        .where(m.created_at >= at, m.product_id.notin_(has_snap)).group_by(m.product_id).subquery()
+    back = db.session.query(Product.id, db.func.coalesce(Product.stock, 0) - db.func.coalesce(later.c.moved, 0))\
+        .outerjoin(later, later.c.product_id == Product.id)\
+        .filter(Product.id.notin_(has_snap),
+                db.or_(Product.created_at.is_(None), Product.created_at < at))
+    if product_ids:
+        back = back.filter(Product.id.in_(product_ids))
+    out.update(back.all())
+    return out
+
+def sell_through_report(first_day, last_day, limit=100, slow=False):
+    """Aralıkta ürün başına açılış, giriş, net satış, kapanış ve satış oranı (satış / (açılış + giriş))."""
+    start, end = day_bounds(first_day, last_day)
+    opening, closing = stock_as_of(start), stock_as_of(end)
+    m = StockMovement
+    is_sale = m.reason.in_(SALE_REASONS)
+    activity = db.session.query(m.product_id,
+                                -db.func.sum(db.case((is_sale, m.delta), else_=0)),
+                                db.func.sum(db.case((is_sale, 0), else_=m.delta)))\
+        .filter(m.created_at >= start, m.created_at < end).group_by(m.product_id).all()
+    moves = {pid: (int(sold or 0), int(recv or 0)) for pid, sold, recv in activity}
+
+    items = []
+    for pid in set(opening) | set(moves):
+        sold, recv = moves.get(pid, (0, 0))
+        op = opening.get(pid, 0)
+        avail = op + max(recv, 0)
+        if not avail and not sold:
+            continue
+        items.append({"product_id": pid, "opening": op, "received": recv, "sold": sold,
+                      "closing": closing.get(pid, 0),
+                      "sell_through": round(sold / avail, 4) if avail > 0 else None})
+    # slow: eldeki stoğu olup en az satanlar (ölü stok)
+    if slow:
+        items = [i for i in items if i["closing"] > 0]
+        items.sort(key=lambda i: (i["sell_through"] or 0, -i["closing"]))
+    else:
+        items.sort(key=lambda i: (-i["sold"], i["product_id"]))
+    items = items[:limit]
+    _attach_titles(items)
+    return items
+
+def reorder_report(days=30, lead_days=7, cover_days=14, limit=100):
+    """Son `days` gündeki net satış hızına göre tedarik süresi içinde bitecek ürünler ve önerilen sipariş."""
+    since = datetime.utcnow() - timedelta(days=days)
+    m = StockMovement
+    sold = (-db.func.sum(m.delta)).label("sold")
+    rate = db.select(m.product_id, sold).where(m.reason.in_(SALE_REASONS), m.created_at >= since)\
+        .group_by(m.product_id).subquery()
+    rows = db.session.query(Product.id, Product.title, Product.barcode,
+                            db.func.coalesce(Product.stock, 0), rate.c.sold)\
+        .join(rate, rate.c.product_id == Product.id).filter(rate.c.sold > 0).all()
+    items = []
+    for pid, title, barcode, stock, n in rows:
+        per_day = n / days
+        if stock > per_day * lead_days:
+            continue
+        items.append({"product_id": pid, "title": title, "barcode": barcode, "stock": stock,
+                      "per_day": round(per_day, 2), "days_left": round(max(stock, 0) / per_day, 1),
+                      "order_qty": max(0, math.ceil(per_day * (lead_days + cover_days)) - max(stock, 0))})
+    items.sort(key=lambda i: (i["days_left"], -i["per_day"]))
+    return items[:limit]
+
+def _attach_titles(items):
+    ids = [i["product_id"] for i in items]
+    names = {}
+    for part in _chunks(ids, 900):
+        names.update((pid, (t, b)) for pid, t, b in db.session.query(Product.id, Product.title, Product.barcode)
+                     .filter(Product.id.in_(part)))
+    for i in items:
+        i["title"], i["barcode"] = names.get(i["product_id"], (None, None))
+
+@app.cli.command("stock-snapshot")
+def stock_snapshot_command():
+    """Stok kontrol noktası al (cron ile günlük önerilir) ve defter dışı farkları raporla.
+    Dağıtımdan sonraki ilk çalıştırma, defter öncesi stoklar için açılış noktasını yazar."""
+    out = take_stock_snapshot()
+    click.echo(f"{out['written']} kontrol noktası yazıldı, {out['drifted']} üründe drift.")
+    for d in out["drift"]:
+        click.echo(f"  #{d['product_id']}: stok {d['stock']}, defter {d['expected']} ({d['drift']:+d})")
+
+@job_handler("stock_snapshot")
+def stock_snapshot_job(job_id):
+    out = take_stock_snapshot()
+    return {k: out[k] for k in ("written", "drifted")}
+
+@app.route("/api/stock/as-of")
+def api_stock_as_of():
+    """?date=YYYY-MM-DD (gün sonu) [&product_id=..]: o tarihteki stok."""
+    try:
+        day = datetime.strptime(request.args["date"], "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        return jsonify({"ok": False, "message": "date=YYYY-MM-DD gerekli"}), 400
+    ids = [int(x) for x in request.args.getlist("product_id") if x.isdigit()]
+    stock = stock_as_of(day_bounds(day, day)[1], ids or None)
+    return jsonify({"date": day.isoformat(), "items": [{"product_id": k, "stock": v} for k, v in sorted(stock.items())]})
+
+@app.route("/api/stock/sell-through")
+def api_sell_through():
+    """?start&end (YYYY-MM-DD, varsayılan bu ay) &order=top|slow &limit"""
+    rng = _export_range()
+    if not rng:
+        return jsonify({"ok": False, "message": "Geçersiz tarih (YYYY-MM-DD)"}), 400
+    limit = max(1, min(request.args.get("limit", 100, type=int), 1000))
+    items = sell_through_report(*rng, limit=limit, slow=request.args.get("order") == "slow")
+    return jsonify({"start": rng[0].isoformat(), "end": rng[1].isoformat(), "items": items})
+
+@app.route("/api/stock/reorder")
+def api_reorder():
+    """?days=30 (satış hızı penceresi) &lead=7 (tedarik günü) &cover=14 (sipariş sonrası hedef gün)"""
+    days = max(1, min(request.args.get("days", 30, type=int), 365))
+    return jsonify({"days": days, "items": reorder_report(
+        days, lead_days=max(0, request.args.get("lead", 7, type=int)),
+        cover_days=max(0, request.args.get("cover", 14, type=int)),
+        limit=max(1, min(request.args.get("limit", 100, type=int), 1000)))})
+
+@app.route("/api/products/<int:product_id>/movements")
+def api_product_movements(product_id):
+    """Ürünün son stok hareketleri ve kontrol noktaları (drift'in nereden geldiğini bulmak için)."""
+    limit = max(1, min(request.args.get("limit", 100, type=int), 1000))
+    moves = StockMovement.query.filter_by(product_id=product_id)\
+        .order_by(StockMovement.created_at.desc(), StockMovement.id.desc()).limit(limit).all()
+    snaps = StockSnapshot.query.filter_by(product_id=product_id)\
+        .order_by(StockSnapshot.taken_at.desc()).limit(20).all()
+    return jsonify({
+        "movements": [{"at": mv.created_at.isoformat(), "delta": mv.delta, "reason": mv.reason,
+                       "ref_id": mv.ref_id} for mv in moves],
+        "snapshots": [{"at": sn.taken_at.isoformat(), "stock": sn.stock, "drift": sn.drift} for sn in snaps],
+    })
+
 # ---- Credit list
 @app.route("/credit")
+@cached_page("customer")
 def credit_page():
-    customers = Customer.query.order_by(Customer.name.asc()).all()
-    return render_template("credit.html", customers=customers)
+    # Borçlular /api/customers?debtors=1 ile SQL'de süzülür
+    return render_template("credit.html")
+
+# ---- Arka plan iş durumu
+@app.route("/api/jobs/<int:job_id>")
+def job_status(job_id):
+    return jsonify(job_to_dict(Job.query.get_or_404(job_id)))
+
+@app.route("/jobs/<int:job_id>/download")
+def job_download(job_id):
+    job = Job.query.get_or_404(job_id)
+    result = json.loads(job.result or "{}")
+    if job.status != "done" or job.output is None:
+        return "Dosya hazır değil", 404
+    return _pdf_response(job.output, result.get("file") or f"is-{job_id}.pdf")
+
+# ---- Önbellek istatistikleri
+@app.route("/api/cache/stats")
+def cache_stats():
+    return jsonify({"barcode": barcode_cache.stats(), "labels": label_cache.stats(),
+                    "search": product_index.stats(), "pages": page_cache.stats()})
+
+# ---- Prometheus metrikleri
+metrics.gauge("barcode_cache_entries", "Barkod önbelleğindeki ürün", lambda: barcode_cache.stats()["size"])
+metrics.gauge("barcode_cache_hit_ratio", "Barkod önbelleği isabet oranı", lambda: barcode_cache.stats()["hit_ratio"])
+metrics.gauge("label_cache_bytes", "Etiket PDF önbelleği boyutu", lambda: label_cache.stats()["bytes"])
+metrics.gauge("search_index_products", "Arama index'indeki ürün", lambda: product_index.stats()["products"])
+
+@app.route("/metrics")
+def metrics_endpoint():
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return "yetkisiz", 401
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+# ---- Shopify kuyruk durumu
+@app.route("/api/shopify/queue")
+def shopify_queue_status():
+    out = outbox_stats()
+    s = get_settings()
+    out["http"] = shopify_client(s).timings() if s.shop_url and s.api_token else {}
+    return jsonify(out)
 
 # ---- Settings
 @app.route("/settings", methods=["GET", "POST"])
@@ -626,7 +2206,7 @@ def settings_page():
 def get_locations():
     s = get_settings()
     try:
-        locs = fetch_locations(s.shop_url, s.api_token)
+        locs = shopify_client(s).locations()
     except Exception as e:
         flash(f"Lokasyon hatası: {e}", "danger")
         return redirect(url_for("settings_page"))
@@ -634,5 +2214,7 @@ def get_locations():
 
 # ---- App entry
 if __name__ == "__main__":
+    with app.app_context():
+        upgrade_database()  # geliştirme: tek süreç
     # Railway dinamik PORT verir
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
@@ -0,0 +1,85 @@
+"""Eşzamanlı checkout stok tutarlılığı testi.
+
+Birçok thread aynı SKU'ları sepete ekleyip satışı tamamlar; sonunda
+stok = başlangıç - satılan adet ve satış/özet toplamları tutarlı olmalı.
+
+    python bench/checkout_stress.py --threads 16 --iterations 25
+    python bench/checkout_stress.py --db postgresql://localhost/stokk_bench
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--iterations", type=int, default=25)
+    ap.add_argument("--db", default=None, help="DATABASE_URL (boş: geçici SQLite)")
+    args = ap.parse_args()
+
+    os.environ["DATABASE_URL"] = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "stress.db")
+    os.environ.setdefault("SHOPIFY_OUTBOX_WORKER", "off")
+    import app as A
+    with A.app.app_context():
+        A.upgrade_database()
+
+    initial = 1_000_000
+    with A.app.app_context():
+        hot = []
+        for code in ("STRESS-A", "STRESS-B"):
+            p = A.Product.query.filter_by(barcode=code).first() or A.Product(title=code, barcode=code, price=1.0)
+            p.stock = initial
+            A.db.session.add(p)
+            hot.append(p)
+        A.db.session.commit()
+        ids = [p.id for p in hot]
+        sold_before = {pid: A.db.session.query(A.db.func.coalesce(A.db.func.sum(A.Sale.qty), 0))
+                       .filter(A.Sale.product_id == pid).scalar() for pid in ids}
+
+    errors, done = [], [0]
+    lock = threading.Lock()
+
+    def worker(n):
+        client = A.app.test_client()
+        for i in range(args.iterations):
+            client.post("/api/cart/add", json={"barcode": "STRESS-A", "qty": 1 + (n + i) % 3})
+            client.post("/api/cart/add", json={"barcode": "STRESS-B", "qty": 1})
+            r = client.post("/api/cart/checkout", json={"payment": "nakit"})
+            with lock:
+                if r.status_code != 200:
+                    errors.append(r.get_data(as_text=True)[:200])
+                else:
+                    done[0] += 1
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    with A.app.app_context():
+        ok = True
+        for pid in ids:
+            stock = A.db.session.get(A.Product, pid).stock
+            sold = A.db.session.query(A.db.func.coalesce(A.db.func.sum(A.Sale.qty), 0))\
+                .filter(A.Sale.product_id == pid).scalar() - sold_before[pid]
+            consistent = stock == initial - sold
+            ok &= consistent
+            print(f"ürün {pid}: stok {stock}, satılan {sold}, tutarlı={consistent}")
+    print(f"{done[0]} checkout, {len(errors)} hata, {elapsed:.2f}s, {done[0] / elapsed:.1f} checkout/s")
+    for e in errors[:5]:
+        print("  hata:", e)
+    sys.exit(0 if ok and not errors else 1)
+
+
+if __name__ == "__main__":
+    main()
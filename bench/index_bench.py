@@ -0,0 +1,130 @@
+"""Index öncesi/sonrası sorgu süreleri.
+
+Geçici bir SQLite (veya --db ile Postgres) veritabanına N satış satırı basar, yeni index'leri düşürüp
+sıcak yol sorgularını ölçer, sonra şema migrasyonuyla (utils.db_migrate)
+index'leri geri ekleyip tekrar ölçer.
+
+    python bench/index_bench.py --sales 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sales", type=int, default=1_000_000)
+    ap.add_argument("--products", type=int, default=20_000)
+    ap.add_argument("--customers", type=int, default=5_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--db", default=None, help="DATABASE_URL (boş: geçici SQLite)")
+    return ap.parse_args()
+
+
+def seed(conn, A, n_sales, n_products, n_customers):
+    """Core insert'lerle (SQLite ve Postgres) müşteri, ürün ve satış basar."""
+    rnd = random.Random(42)
+    now = datetime.utcnow()
+    sale, product, customer = A.Sale.__table__, A.Product.__table__, A.Customer.__table__
+    for t in (sale, product, customer):
+        conn.execute(t.delete())
+    conn.execute(customer.insert(), [
+        {"id": i, "name": f"Müşteri {i}", "debt": 0.0, "created_at": now} for i in range(1, n_customers + 1)])
+    conn.execute(product.insert(), [
+        {"id": i, "source": "shopify", "title": f"Ürün {i}", "barcode": f"B{i:08d}", "price": 10.0 + i % 90,
+         "stock": rnd.randint(0, 40), "shopify_variant_id": str(900000 + i)} for i in range(1, n_products + 1)])
+    pays = ["nakit", "kart", "veresiye"]
+    batch = []
+    for i in range(n_sales):
+        pay = pays[i % 3]
+        batch.append({"created_at": now - timedelta(seconds=rnd.randint(0, 3 * 365 * 86400)),
+                      "customer_id": rnd.randint(1, n_customers) if rnd.random() < 0.3 else None,
+                      "product_id": rnd.randint(1, n_products), "qty": 1, "unit_price": 10.0,
+                      "total_price": 10.0, "payment": pay, "is_paid": pay != "veresiye"})
+        if len(batch) == 50_000:
+            conn.execute(sale.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(sale.insert(), batch)
+
+
+def timed(fn, repeat):
+    out = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t) * 1000)
+    return statistics.median(out)
+
+
+def main():
+    args = parse_args()
+    if args.db:
+        os.environ["DATABASE_URL"] = args.db
+    else:
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ.setdefault("SHOPIFY_OUTBOX_WORKER", "off")
+
+    import app as A
+    with A.app.app_context():
+        A.upgrade_database()
+    from utils.db_migrate import upgrade
+    from utils.report_utils import day_bounds, daily_sums
+
+    db = A.db
+    with A.app.app_context():
+        engine = db.engine
+        new_indexes = [i for t in db.metadata.sorted_tables for i in t.indexes if not i.unique]
+
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            seed(conn, A, args.sales, args.products, args.customers)
+        print(f"seed: {args.sales} satış, {time.perf_counter() - t0:.1f}s")
+
+        today = datetime.utcnow().date()
+        month_start = today.replace(day=1)
+        year_ago = datetime.utcnow() - timedelta(days=365)
+        S, P, CP = A.Sale, A.Product, A.CreditPayment
+
+        queries = {
+            "customer_detail (customer_id, created_at)": lambda: S.query.filter(
+                S.customer_id == 77, S.created_at >= year_ago).order_by(S.created_at.desc()).all(),
+            "aylık günlük satış (created_at, is_paid)": lambda: daily_sums(
+                db.session, S.created_at, S.total_price, *day_bounds(month_start, today), S.is_paid == True),
+            "aylık tahsilat (credit_payment.created_at)": lambda: daily_sums(
+                db.session, CP.created_at, CP.amount, *day_bounds(month_start, today)),
+            "düşük stok sayımı (product.stock)": lambda: P.query.filter(P.stock <= 2).count(),
+            "variant eşleme (shopify_variant_id)": lambda: [
+                P.query.filter_by(shopify_variant_id=str(900000 + i)).first() for i in range(1, 200, 7)],
+        }
+
+        def run():
+            db.session.remove()
+            return {name: timed(fn, args.repeat) for name, fn in queries.items()}
+
+        with engine.begin() as conn:
+            for idx in new_indexes:
+                idx.drop(bind=conn, checkfirst=True)
+        before = run()
+
+        t0 = time.perf_counter()
+        applied = upgrade(engine, db.metadata)
+        print(f"migrasyon: {len(applied)} index, {time.perf_counter() - t0:.1f}s")
+        after = run()
+
+    w = max(len(k) for k in queries)
+    print(f"{'sorgu':<{w}}  {'önce ms':>10}  {'sonra ms':>10}")
+    for k in queries:
+        print(f"{k:<{w}}  {before[k]:>10.2f}  {after[k]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Etiket üretim hızı: eski disk yolu vs bellek (PNG) vs vektör vs önbellek.
+
+Disk yolu geçici bir klasöre yazar ve send_file'ın yapacağı gibi PDF'i geri
+okur; diğerleri tamamen bellekte çalışır.
+
+    python bench/label_bench.py --labels 300
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from barcode import Code128  # noqa: E402
+from barcode.writer import ImageWriter  # noqa: E402
+from reportlab.lib.pagesizes import A7, landscape  # noqa: E402
+from reportlab.lib.utils import ImageReader  # noqa: E402
+from reportlab.pdfgen import canvas  # noqa: E402
+
+from utils.barcode_utils import code128_png_bytes  # noqa: E402
+from utils.bytes_lru import BytesLRU  # noqa: E402
+from utils.pdf_utils import _draw_png_label, label_pdf_bytes, label_pdf_png_bytes, label_sheet_pdf  # noqa: E402
+
+
+def parse_args():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--labels", type=int, default=300)
+    ap.add_argument("--distinct", type=int, default=50, help="önbellek senaryosunda farklı ürün sayısı")
+    return ap.parse_args()
+
+
+def items(n):
+    return [(f"MS{i:08d}", f"Ürün Şık Gömlek {i}", 100 + i % 250 + 0.9) for i in range(n)]
+
+
+def disk_label(code, name, price, png_path, pdf_path):
+    """Eski disk yolu (karşılaştırma tabanı): PNG ve PDF dosyaya yazılır."""
+    with open(png_path, "wb") as f:
+        Code128(code, writer=ImageWriter()).write(f)
+    c = canvas.Canvas(pdf_path, pagesize=landscape(A7))
+    _draw_png_label(c, code, name, price, ImageReader(png_path))
+
+
+def run(name, n, fn):
+    t0 = time.perf_counter()
+    size = fn()
+    dt = time.perf_counter() - t0
+    print(f"{name:<28} {n / dt:9.1f} etiket/sn  ({dt * 1000:8.1f} ms, {size / 1024:8.1f} KB)")
+
+
+def main():
+    args = parse_args()
+    rows = items(args.labels)
+    tmp = tempfile.mkdtemp(prefix="label_bench_")
+    for sub in ("barcodes", "labels"):
+        os.makedirs(os.path.join(tmp, sub))
+
+    def disk():
+        total = 0
+        for code, name, price in rows:
+            png = os.path.join(tmp, "barcodes", f"{code}.png")
+            pdf = os.path.join(tmp, "labels", f"{code}.pdf")
+            disk_label(code, name, price, png, pdf)
+            with open(pdf, "rb") as f:
+                total += len(f.read())
+        return total
+
+    def memory_png():
+        return sum(len(label_pdf_png_bytes(c, n, p, code128_png_bytes(c))) for c, n, p in rows)
+
+    def vector():
+        return sum(len(label_pdf_bytes(c, n, p)) for c, n, p in rows)
+
+    def sheet():
+        return len(label_sheet_pdf(rows))
+
+    def cached():
+        cache = BytesLRU(max_items=args.distinct * 2)
+        hot = rows[:args.distinct]
+        total = 0
+        for i in range(args.labels):
+            c, n, p = hot[i % len(hot)]
+            total += len(cache.get_or_render((c, n, p), lambda: label_pdf_bytes(c, n, p)))
+        return total
+
+    try:
+        print(f"{args.labels} etiket")
+        run("disk (PNG + PDF dosya)", args.labels, disk)
+        run("bellek (PNG -> BytesIO)", args.labels, memory_png)
+        run("vektör (tek etiket)", args.labels, vector)
+        run("vektör (A4 toplu sayfa)", args.labels, sheet)
+        run(f"LRU ({args.distinct} farklı ürün)", args.labels, cached)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
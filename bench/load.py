@@ -0,0 +1,262 @@
+"""Yük testi ve benchmark harness'ı.
+
+Geçici (veya --db ile verilen SQLite/Postgres) veritabanına bench/seed.py ile
+sentetik mağaza basar, yerel Shopify stub'ı başlatır ve:
+
+  1. her senaryoyu Flask test client'ı ile sırayla çalıştırıp istek başına
+     gecikme ve SQL sorgu sayısını ölçer,
+  2. --threads thread ile karışık yük (satış ağırlıklı) uygular,
+  3. Shopify senkronunu (tam + artımlı) stub'a karşı ölçer.
+
+Sonuç p50/p90/p99/max ms ve istek başına sorgu olarak yazılır. --json ile
+kaydedilen çıktı sonraki koşuda --baseline verilirse karşılaştırılır; p90 veya
+sorgu sayısı eşiği aşan senaryo varsa çıkış kodu 1 olur (deploy öncesi kontrol).
+
+    python bench/load.py --products 20000 --customers 5000 --years 2 --json bench.json
+    python bench/load.py --baseline bench.json
+    python bench/load.py --db postgresql://localhost/stokk_bench --reset --threads 16
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import seed_store  # noqa: E402
+from shopify_stub import ShopifyStub  # noqa: E402
+
+HOT_PRODUCTS = 500  # yük altında satılan ürünler (stok bitmesin diye yüksek stok verilir)
+
+
+def parse_args():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=None, help="DATABASE_URL (boş: geçici SQLite)")
+    ap.add_argument("--reset", action="store_true", help="--db verilirse mevcut veriyi silip yeniden bas")
+    ap.add_argument("--no-seed", action="store_true", help="--db'deki mevcut veriyi kullan")
+    ap.add_argument("--products", type=int, default=5_000)
+    ap.add_argument("--customers", type=int, default=2_000)
+    ap.add_argument("--years", type=float, default=1.0)
+    ap.add_argument("--orders-per-day", type=int, default=60)
+    ap.add_argument("--iterations", type=int, default=30, help="sıralı ölçümde senaryo başına istek")
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=10.0, help="karışık yük süresi (sn)")
+    ap.add_argument("--stub-products", type=int, default=2_000)
+    ap.add_argument("--stub-latency-ms", type=int, default=0)
+    ap.add_argument("--json", default=None, help="sonuçları bu dosyaya yaz")
+    ap.add_argument("--baseline", default=None, help="önceki --json çıktısıyla karşılaştır")
+    ap.add_argument("--tolerance", type=float, default=0.5, help="p90 için izin verilen artış oranı")
+    return ap.parse_args()
+
+
+class Recorder:
+    """Senaryo başına gecikme (ms), sorgu sayısı ve hata kaydı; thread güvenli."""
+
+    def __init__(self, local):
+        self.local = local
+        self.lat = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def call(self, name, fn, *args, **kw):
+        self.local.queries = 0
+        t0 = time.perf_counter()
+        resp = fn(*args, **kw)
+        ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self.lat[name].append(ms)
+            self.queries[name].append(self.local.queries)
+            if resp.status_code >= 400:
+                self.errors[name] += 1
+        return resp
+
+    def summary(self):
+        out = {}
+        for name, vals in self.lat.items():
+            vals = sorted(vals)
+            pct = statistics.quantiles(vals, n=100, method="inclusive") if len(vals) > 1 else vals * 99
+            out[name] = {"n": len(vals), "p50": round(pct[49], 2), "p90": round(pct[89], 2),
+                         "p99": round(pct[98], 2), "max": round(vals[-1], 2),
+                         "queries": round(statistics.mean(self.queries[name]), 2),
+                         "errors": self.errors[name]}
+        return out
+
+
+def scenarios(barcodes, customer_terms, product_terms):
+    """(ad, ağırlık, fonksiyon(client, rnd, rec)) listesi; ağırlık karışık yük içindir."""
+    def cart_add(c, rnd, rec):
+        rec.call("api_cart_add", c.post, "/api/cart/add", json={"barcode": rnd.choice(barcodes), "qty": 1})
+
+    def checkout(c, rnd, rec):
+        for _ in range(rnd.randint(1, 4)):
+            rec.call("api_cart_add", c.post, "/api/cart/add", json={"barcode": rnd.choice(barcodes), "qty": 1})
+        rec.call("api_cart_checkout", c.post, "/api/cart/checkout",
+                 json={"payment": rnd.choice(("nakit", "kart"))})
+
+    def dashboard(c, rnd, rec):
+        rec.call("dashboard", c.get, "/")
+
+    def reports(c, rnd, rec):
+        rec.call("reports_page", c.get, "/reports")
+
+    def products_api(c, rnd, rec):
+        rec.call("api_products", c.get, "/api/products?length=50&start=%d" % (rnd.randint(0, 20) * 50))
+
+    def product_search(c, rnd, rec):
+        rec.call("api_product_search", c.get, "/api/products/search?q=" + rnd.choice(product_terms))
+
+    def customer_search(c, rnd, rec):
+        rec.call("api_customer_search", c.get, "/api/customers/search?q=" + rnd.choice(customer_terms))
+
+    return [("cart_add", 4, cart_add), ("checkout", 3, checkout), ("product_search", 2, product_search),
+            ("customer_search", 1, customer_search), ("dashboard", 1, dashboard),
+            ("reports", 1, reports), ("products_api", 1, products_api)]
+
+
+def print_table(title, summary):
+    print(f"\n== {title}")
+    print(f"{'senaryo':<22}{'n':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'sorgu':>8}{'hata':>6}")
+    for name, s in sorted(summary.items()):
+        print(f"{name:<22}{s['n']:>7}{s['p50']:>9.2f}{s['p90']:>9.2f}{s['p99']:>9.2f}{s['max']:>9.2f}"
+              f"{s['queries']:>8.2f}{s['errors']:>6}")
+
+
+def compare(results, baseline, tolerance):
+    """Eşik aşan (bölüm, senaryo, açıklama) listesi."""
+    bad = []
+    for section in ("sequential", "sync"):
+        for name, cur in results.get(section, {}).items():
+            old = baseline.get(section, {}).get(name)
+            if not old:
+                continue
+            if cur["p90"] > old["p90"] * (1 + tolerance) and cur["p90"] - old["p90"] > 2:
+                bad.append((section, name, f"p90 {old['p90']} -> {cur['p90']} ms"))
+            if cur["queries"] > old["queries"] + 0.5:
+                bad.append((section, name, f"sorgu {old['queries']} -> {cur['queries']}"))
+    return bad
+
+
+def main():
+    args = parse_args()
+    stub = ShopifyStub(args.stub_products, latency_ms=args.stub_latency_ms).start()
+    os.environ["DATABASE_URL"] = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "load.db")
+    os.environ["SHOPIFY_API_BASE"] = stub.base_url
+    os.environ.setdefault("SHOPIFY_OUTBOX_WORKER", "off")
+    os.environ.setdefault("JOB_RUNNER", "external")
+
+    import app as A
+    with A.app.app_context():
+        A.upgrade_database()
+    from sqlalchemy import event
+
+    local = threading.local()
+    with A.app.app_context():
+        engine = A.db.engine
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _count(*_):
+            local.queries = getattr(local, "queries", 0) + 1
+
+        if not args.no_seed:
+            t0 = time.perf_counter()
+            counts = seed_store(A, args.products, args.customers, args.years, args.orders_per_day,
+                                reset=args.reset or not args.db)
+            print("seed:", ", ".join(f"{v} {k}" for k, v in counts.items()), f"({time.perf_counter() - t0:.1f}s)")
+
+        hot = A.db.session.query(A.Product.id, A.Product.barcode).filter(A.Product.barcode.isnot(None))\
+            .order_by(A.Product.id).limit(HOT_PRODUCTS).all()
+        A.db.session.execute(A.db.update(A.Product).where(A.Product.id.in_([h.id for h in hot]))
+                             .values(stock=1_000_000))
+        names = [n for (n,) in A.db.session.query(A.Customer.name).limit(200)]
+        titles = [t for (t,) in A.db.session.query(A.Product.title).limit(200)]
+        s = A.get_settings()
+        s.shop_url, s.api_token, s.location_id = "bench.myshopify.com", "bench-token", "7"
+        A.db.session.commit()
+        barcodes = [h.barcode for h in hot]
+        customer_terms = sorted({n.split()[0][:3] for n in names} | {n.split()[-1][:4] for n in names})
+        product_terms = sorted({" ".join(w[:4] for w in t.split()[:2]) for t in titles})
+
+    scen = scenarios(barcodes, customer_terms, product_terms)
+    results = {"config": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")},
+               "dialect": engine.dialect.name}
+
+    # 1) Sıralı: tek client, senaryo başına ısınma + ölçüm
+    rec = Recorder(local)
+    warm = Recorder(local)
+    client = A.app.test_client()
+    rnd = random.Random(1)
+    for _, _, fn in scen:
+        for _ in range(2):
+            fn(client, rnd, warm)
+        for _ in range(args.iterations):
+            fn(client, rnd, rec)
+    results["sequential"] = rec.summary()
+    print_table(f"sıralı ({engine.dialect.name})", results["sequential"])
+
+    # 2) Karışık yük: her thread kendi client'ı (kendi sepeti)
+    rec = Recorder(local)
+    weighted = [fn for _, w, fn in scen for _ in range(w)]
+    stop = time.perf_counter() + args.duration
+    done = [0]
+    lock = threading.Lock()
+
+    def worker(n):
+        c = A.app.test_client()
+        r = random.Random(100 + n)
+        while time.perf_counter() < stop:
+            r.choice(weighted)(c, r, rec)
+            with lock:
+                done[0] += 1
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    results["load"] = rec.summary()
+    results["load_throughput"] = round(sum(s["n"] for s in results["load"].values()) / elapsed, 1)
+    print_table(f"karışık yük ({args.threads} thread, {elapsed:.1f}s, "
+                f"{results['load_throughput']} istek/sn)", results["load"])
+
+    # 3) Shopify senkronu (stub): tam, sonra artımlı (değişiklik yok)
+    rec = Recorder(local)
+
+    class _Done:
+        status_code = 200
+
+    with A.app.app_context():
+        for name, full in (("shopify_sync_full", True), ("shopify_sync_incremental", False)):
+            def run(full=full):
+                A.run_shopify_sync(A.get_settings(), full=full)
+                return _Done
+            rec.call(name, run)
+    results["sync"] = rec.summary()
+    print_table(f"Shopify senkronu ({args.stub_products} ürün, {stub.requests} HTTP isteği)", results["sync"])
+    stub.stop()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            bad = compare(results, json.load(f), args.tolerance)
+        for section, name, msg in bad:
+            print(f"GERİLEME [{section}] {name}: {msg}")
+        if bad:
+            sys.exit(1)
+        print("\nBaseline ile karşılaştırma: gerileme yok.")
+
+
+if __name__ == "__main__":
+    main()
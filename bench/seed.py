@@ -0,0 +1,187 @@
+"""Sentetik mağaza verisi üretici.
+
+N ürün, M müşteri ve geriye doğru Y yıllık fiş/satış, tahsilat ve iade kaydı
+basar; sonunda günlük özet (rollup) yeniden hesaplanır. Aynı --seed aynı veriyi
+üretir. Tek başına veya bench/load.py içinden kullanılır.
+
+    python bench/seed.py --db sqlite:///bench.db --products 20000 --customers 5000 --years 2
+    python bench/seed.py --db postgresql://localhost/stokk_bench --reset
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIRST = ["Ayşe", "Fatma", "Zeynep", "Elif", "Şule", "Gül", "Mehmet", "Mustafa", "Ali", "Hüseyin",
+         "İbrahim", "Ömer", "Çağla", "Işıl", "Ümit", "Özge", "Burak", "Can", "Deniz", "Ebru"]
+LAST = ["Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Yıldız", "Öztürk", "Aydın", "Özdemir", "Arslan",
+        "Doğan", "Kılıç", "Aslan", "Çetin", "Kara", "Koç", "Kurt", "Özkan", "Şimşek", "Güneş"]
+ITEMS = ["Gömlek", "Pantolon", "Ceket", "Etek", "Şort", "Kazak", "Tişört", "Elbise", "Mont", "Yelek",
+         "Çanta", "Ayakkabı", "Kemer", "Şapka", "Atkı", "Hırka", "Eşofman", "Bluz", "Tunik", "Çorap"]
+COLORS = ["Siyah", "Beyaz", "Kırmızı", "Lacivert", "Yeşil", "Gri", "Bej", "Pembe", "Mavi", "Sarı"]
+SIZES = ["XS", "S", "M", "L", "XL"]
+PAYMENTS = ["nakit", "kart", "kart", "veresiye"]
+BATCH = 5000
+
+# Sırayla silinir (FK'ler)
+TABLES = ["sale", "orders", "credit_payment", "return_exchange", "daily_summary", "cart_line",
+          "shopify_outbox", "product", "customer"]
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=None, help="DATABASE_URL (boş: ortam değişkeni / data.db)")
+    ap.add_argument("--products", type=int, default=5_000)
+    ap.add_argument("--customers", type=int, default=2_000)
+    ap.add_argument("--years", type=float, default=1.0)
+    ap.add_argument("--orders-per-day", type=int, default=60)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--reset", action="store_true", help="mevcut satış/ürün/müşteri verisini sil")
+    return ap.parse_args(argv)
+
+
+def _insert(conn, table, rows):
+    for i in range(0, len(rows), BATCH):
+        conn.execute(table.insert(), rows[i:i + BATCH])
+
+
+def _fix_sequences(conn, tables):
+    # Açık id ile basılan tablolarda Postgres sequence'ını ileri al
+    if conn.dialect.name != "postgresql":
+        return
+    for t in tables:
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{t}', 'id'), COALESCE((SELECT MAX(id) FROM {t}), 1))")
+
+
+def seed_store(A, products=5_000, customers=2_000, years=1.0, orders_per_day=60, seed=42, reset=False):
+    """A: app modülü. Uygulama bağlamı içinde çağrılmalı. Üretilen satır sayılarını döner."""
+    from utils.text_utils import tr_fold, phone_key
+
+    rnd = random.Random(seed)
+    db = A.db
+    T = db.metadata.tables
+    now = datetime.utcnow().replace(microsecond=0)
+    counts = {}
+
+    with db.engine.begin() as conn:
+        if reset:
+            for name in TABLES:
+                conn.execute(T[name].delete())
+        base_p = conn.execute(db.select(db.func.coalesce(db.func.max(A.Product.id), 0))).scalar()
+        base_c = conn.execute(db.select(db.func.coalesce(db.func.max(A.Customer.id), 0))).scalar()
+        base_o = conn.execute(db.select(db.func.coalesce(db.func.max(A.Order.id), 0))).scalar()
+
+        prows = []
+        for i in range(1, products + 1):
+            shopify = i % 3 != 0
+            prows.append({
+                "id": base_p + i, "source": "shopify" if shopify else "manual",
+                "title": f"{rnd.choice(COLORS)} {rnd.choice(ITEMS)} {rnd.choice(SIZES)} M{i:05d}",
+                "barcode": f"BN{seed:02d}{base_p + i:08d}", "price": round(rnd.uniform(50, 2500), 2),
+                "stock": rnd.randint(0, 60), "created_at": now - timedelta(days=rnd.randint(0, int(365 * years))),
+                "shopify_variant_id": str(4_000_000 + base_p + i) if shopify else None,
+                "shopify_inventory_item_id": str(8_000_000 + base_p + i) if shopify else None,
+            })
+        _insert(conn, T["product"], prows)
+        counts["products"] = len(prows)
+
+        crows = []
+        for i in range(1, customers + 1):
+            name = f"{rnd.choice(FIRST)} {rnd.choice(LAST)}"
+            phone = f"05{rnd.randint(30, 59)} {rnd.randint(100, 999)} {rnd.randint(10, 99)} {rnd.randint(10, 99)}"
+            crows.append({"id": base_c + i, "name": name, "phone": phone, "email": None, "debt": 0.0,
+                          "created_at": now - timedelta(days=rnd.randint(0, int(365 * years))),
+                          "search_key": tr_fold(name), "phone_key": phone_key(phone)})
+
+        # Fişler + satış satırları, gün gün
+        orows, srows, debts = [], [], {}
+        oid = base_o
+        start = now - timedelta(days=int(365 * years))
+        day = start
+        while day < now:
+            for _ in range(max(0, int(rnd.gauss(orders_per_day, orders_per_day * 0.2)))):
+                oid += 1
+                at = day + timedelta(seconds=rnd.randint(9 * 3600, 21 * 3600))
+                pay = rnd.choice(PAYMENTS)
+                cust = base_c + rnd.randint(1, customers) if customers and (pay == "veresiye" or rnd.random() < 0.25) else None
+                if cust is None and pay == "veresiye":
+                    pay = "nakit"
+                lines = [(base_p + rnd.randint(1, products), rnd.choice((1, 1, 1, 2, 3))) for _ in range(rnd.randint(1, 4))]
+                subtotal = 0.0
+                for pid, qty in lines:
+                    price = prows[pid - base_p - 1]["price"]
+                    subtotal += price * qty
+                    srows.append({"created_at": at, "customer_id": cust, "product_id": pid, "order_id": oid,
+                                  "qty": qty, "unit_price": price, "total_price": round(price * qty, 2),
+                                  "payment": pay, "is_paid": pay != "veresiye"})
+                orows.append({"id": oid, "created_at": at, "customer_id": cust, "payment": pay,
+                              "is_paid": pay != "veresiye", "subtotal": round(subtotal, 2), "discount": 0.0,
+                              "total": round(subtotal, 2), "item_count": sum(q for _, q in lines),
+                              "line_count": len(lines)})
+                if pay == "veresiye":
+                    debts[cust] = debts.get(cust, 0.0) + subtotal
+            if len(srows) >= 50_000:
+                _insert(conn, T["orders"], orows)
+                _insert(conn, T["sale"], srows)
+                counts["orders"] = counts.get("orders", 0) + len(orows)
+                counts["sales"] = counts.get("sales", 0) + len(srows)
+                orows, srows = [], []
+            day += timedelta(days=1)
+        _insert(conn, T["orders"], orows)
+        _insert(conn, T["sale"], srows)
+        counts["orders"] = counts.get("orders", 0) + len(orows)
+        counts["sales"] = counts.get("sales", 0) + len(srows)
+
+        # Tahsilatlar: borcun bir kısmı ödenmiş
+        pays = []
+        for cust, debt in debts.items():
+            paid = round(debt * rnd.uniform(0.3, 1.0), 2)
+            pays.append({"customer_id": cust, "amount": paid,
+                         "created_at": now - timedelta(days=rnd.randint(0, int(365 * years)))})
+            debts[cust] = round(debt - paid, 2)
+        for c in crows:
+            c["debt"] = debts.get(c["id"], 0.0)
+        _insert(conn, T["customer"], crows)
+        _insert(conn, T["credit_payment"], pays)
+        counts["customers"] = len(crows)
+        counts["credit_payments"] = len(pays)
+
+        rets = []
+        for _ in range(max(1, counts["sales"] // 100)):
+            pid = base_p + rnd.randint(1, products)
+            rets.append({"created_at": now - timedelta(days=rnd.randint(0, int(365 * years))),
+                         "type": rnd.choice(("iade", "degisim")), "old_product_id": pid,
+                         "new_product_id": pid if rnd.random() < 0.5 else None, "qty": 1, "note": "seed"})
+        _insert(conn, T["return_exchange"], rets)
+        counts["returns"] = len(rets)
+        _fix_sequences(conn, ["product", "customer", "orders"])
+
+    A.rebuild_summary()
+    A.warm_barcode_cache()
+    return counts
+
+
+def main():
+    args = parse_args()
+    if args.db:
+        os.environ["DATABASE_URL"] = args.db
+    os.environ.setdefault("SHOPIFY_OUTBOX_WORKER", "off")
+    import app as A
+    with A.app.app_context():
+        A.upgrade_database()
+
+    t0 = time.perf_counter()
+    with A.app.app_context():
+        counts = seed_store(A, args.products, args.customers, args.years, args.orders_per_day,
+                            args.seed, args.reset)
+    print(", ".join(f"{v} {k}" for k, v in counts.items()), f"— {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
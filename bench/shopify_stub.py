@@ -0,0 +1,118 @@
+"""Yerel Shopify Admin REST stub'ı (bench ve yük testleri için).
+
+products.json (Link: rel="next" sayfalama, updated_at_min), locations.json,
+inventory_levels.json ve inventory_levels/set.json uçlarını taklit eder;
+X-Shopify-Shop-Api-Call-Limit başlığı döner, isteğe bağlı gecikme ekler.
+
+    python bench/shopify_stub.py --products 5000 --port 8765
+    SHOPIFY_API_BASE=http://127.0.0.1:8765/admin/api/2024-04 flask run
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class ShopifyStub:
+    def __init__(self, products=1000, page_size=250, latency_ms=0, port=0, variants=1):
+        self.page_size = page_size
+        self.latency = latency_ms / 1000.0
+        self.products = [{
+            "id": i, "title": f"Stub Ürün {i}", "updated_at": "2026-01-01T10:00:00Z",
+            "variants": [{"id": 1_000_000 + i * 10 + v, "price": f"{10 + i % 90}.90",
+                          "inventory_quantity": i % 40, "barcode": f"ST{i:07d}{v}",
+                          "inventory_item_id": 5_000_000 + i * 10 + v} for v in range(variants)],
+        } for i in range(1, products + 1)]
+        self.levels = {}
+        self.sets = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.port = self.server.server_address[1]
+        self.base_url = f"http://127.0.0.1:{self.port}/admin/api/2024-04"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, obj, link=None):
+                body = json.dumps(obj).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("X-Shopify-Shop-Api-Call-Limit", "2/40")
+                if link:
+                    self.send_header("Link", f'<{link}>; rel="next"')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _enter(self):
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+            def do_GET(self):
+                self._enter()
+                u = urlsplit(self.path)
+                q = parse_qs(u.query)
+                if u.path.endswith("/products.json"):
+                    items = stub.products
+                    if q.get("updated_at_min"):
+                        items = [p for p in items if p["updated_at"] >= q["updated_at_min"][0]]
+                    off = int(q.get("page_info", ["0"])[0])
+                    nxt = off + stub.page_size
+                    link = (f"{stub.base_url}/products.json?page_info={nxt}&limit={stub.page_size}"
+                            + (f"&updated_at_min={q['updated_at_min'][0]}" if q.get("updated_at_min") else "")
+                            if nxt < len(items) else None)
+                    return self._send({"products": items[off:nxt]}, link)
+                if u.path.endswith("/locations.json"):
+                    return self._send({"locations": [{"id": 7, "name": "Mağaza", "active": True}]})
+                if u.path.endswith("/inventory_levels.json"):
+                    ids = q.get("inventory_item_ids", [""])[0].split(",")
+                    return self._send({"inventory_levels": [
+                        {"inventory_item_id": int(i), "location_id": 7, "available": stub.levels.get(i, 0)}
+                        for i in ids if i]})
+                self.send_error(404)
+
+            def do_POST(self):
+                self._enter()
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                if not self.path.endswith("/inventory_levels/set.json"):
+                    return self.send_error(404)
+                with stub._lock:
+                    stub.sets += 1
+                    stub.levels[str(body.get("inventory_item_id"))] = body.get("available")
+                return self._send({"inventory_level": body})
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=1000)
+    ap.add_argument("--page-size", type=int, default=250)
+    ap.add_argument("--latency-ms", type=int, default=0)
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+    stub = ShopifyStub(args.products, args.page_size, args.latency_ms, args.port)
+    print(f"SHOPIFY_API_BASE={stub.base_url}")
+    stub.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
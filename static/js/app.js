@@ -1 +1,130 @@
 console.log("MSS Panel yüklendi");
+
+// Sunucu taraflı DataTables. Sayfalar sırayla ilerlerken son yanıtın
+// next_cursor'ı gönderilir (keyset); rastgele sayfaya atlamada start/OFFSET kullanılır.
+function serverTable(selector, url, columns, opts) {
+  let last = null;
+  return $(selector).DataTable(Object.assign({
+    serverSide: true,
+    processing: true,
+    searchDelay: 350,
+    pageLength: 50,
+    columns: columns,
+    ajax: {
+      url: url,
+      data: function (d) {
+        const sig = JSON.stringify([d.order, d.search.value, d.length]);
+        if (last && last.cursor && last.sig === sig && d.start === last.start + d.length) {
+          d.cursor = last.cursor;
+        }
+        d._sig = sig;
+      },
+      dataFilter: function (raw) {
+        const json = JSON.parse(raw);
+        const p = this.url.split('?')[1] || '';
+        const q = new URLSearchParams(p);
+        last = {start: parseInt(q.get('start') || '0', 10), sig: q.get('_sig'), cursor: json.next_cursor};
+        return raw;
+      }
+    }
+  }, opts || {}));
+}
+
+function escapeHtml(s) {
+  return String(s == null ? '' : s).replace(/[&<>"']/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+}
+
+function money(v) {
+  return (parseFloat(v) || 0).toFixed(2);
+}
+
+// Müşteri arama kutusu: yazdıkça /api/customers/search, seçilen id gizli alana yazılır.
+function customerTypeahead(input, hidden) {
+  const menu = document.createElement('div');
+  menu.className = 'list-group position-absolute w-100 shadow-sm';
+  menu.style.zIndex = 1000;
+  input.parentNode.style.position = 'relative';
+  input.after(menu);
+  let timer = null, seq = 0;
+  const close = () => { menu.innerHTML = ''; };
+
+  input.addEventListener('input', () => {
+    hidden.value = '';
+    clearTimeout(timer);
+    const q = input.value.trim();
+    if (q.length < 2) { close(); return; }
+    timer = setTimeout(async () => {
+      const my = ++seq;
+      const res = await fetch('/api/customers/search?limit=8&q=' + encodeURIComponent(q));
+      if (my !== seq || !res.ok) return;  // eski yanıtları yok say
+      const list = await res.json();
+      menu.innerHTML = list.map(c => `<button type="button" class="list-group-item list-group-item-action" data-id="${c.id}">`
+        + `${escapeHtml(c.name)}${c.phone ? ' - ' + escapeHtml(c.phone) : ''}</button>`).join('')
+        || '<div class="list-group-item text-muted">Bulunamadı</div>';
+    }, 200);
+  });
+  menu.addEventListener('mousedown', e => {
+    const b = e.target.closest('[data-id]');
+    if (!b) return;
+    e.preventDefault();
+    hidden.value = b.dataset.id;
+    input.value = b.textContent;
+    close();
+  });
+  input.addEventListener('blur', close);
+}
+
+// POS barkod kataloğu: /api/catalog anlık görüntüsü localStorage'da tutulur,
+// /api/catalog/changes?since=sürüm ile güncellenir (barkodu boş gelen satır silinir).
+function posCatalog(key) {
+  key = key || 'pos_catalog';
+  const byBarcode = new Map(), barcodeOf = new Map();
+  let version = null, busy = null;
+
+  function put(row) {  // [id, barkod, ad, fiyat]
+    const old = barcodeOf.get(row[0]);
+    if (old && byBarcode.get(old) && byBarcode.get(old)[0] === row[0]) byBarcode.delete(old);
+    barcodeOf.delete(row[0]);
+    if (row[1]) { byBarcode.set(row[1], row); barcodeOf.set(row[0], row[1]); }
+  }
+  function load(data) {
+    byBarcode.clear(); barcodeOf.clear();
+    data.items.forEach(put);
+    version = data.version;
+  }
+  function save() {
+    try {
+      localStorage.setItem(key, JSON.stringify({version: version, items: Array.from(byBarcode.values())}));
+    } catch (e) { /* kota dolu: yalnız bellekte tut */ }
+  }
+  async function full() {
+    const res = await fetch('/api/catalog');
+    if (!res.ok) throw new Error('katalog yüklenemedi');
+    load(await res.json());
+    save();
+  }
+  async function delta() {
+    const res = await fetch('/api/catalog/changes?since=' + version);
+    if (!res.ok) throw new Error('katalog güncellenemedi');
+    const out = await res.json();
+    if (out.reset) return full();
+    if (out.items.length) { out.items.forEach(put); }
+    if (out.items.length || out.version !== version) { version = out.version; save(); }
+  }
+  function refresh() {  // eşzamanlı çağrılar aynı isteği bekler
+    if (!busy) busy = (version === null ? full() : delta()).finally(() => { busy = null; });
+    return busy;
+  }
+  async function init() {
+    try {
+      const cached = JSON.parse(localStorage.getItem(key) || 'null');
+      if (cached && cached.items) load(cached);
+    } catch (e) { /* bozuk kayıt: baştan çek */ }
+    await refresh();
+  }
+  function get(code) {
+    const r = byBarcode.get(code);
+    return r ? {product_id: r[0], barcode: r[1], title: r[2], price: r[3]} : null;
+  }
+  return {init: init, refresh: refresh, get: get, size: () => byBarcode.size, version: () => version};
+}
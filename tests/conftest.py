@@ -0,0 +1,14 @@
+"""Testler tek geçici SQLite veritabanında çalışır; app import edilmeden önce ayarlanır."""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "stokk_test.db")
+os.environ["SHOPIFY_OUTBOX_WORKER"] = "off"
+
+import app as A  # noqa: E402
+
+with A.app.app_context():
+    A.upgrade_database()
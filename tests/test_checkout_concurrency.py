@@ -0,0 +1,99 @@
+"""Eşzamanlı checkout: stok, satış satırları ve veresiye borcu tutarlı kalmalı.
+
+bench/checkout_stress.py'nin küçük, doğrulayan hâli (geçici SQLite, bkz. conftest.py).
+
+    python -m pytest -q tests
+"""
+import threading
+
+import app as A
+
+THREADS = 8
+ITERATIONS = 10
+INITIAL = 1000
+PRICE = 2.5
+
+
+def test_concurrent_checkouts_keep_stock_sales_and_debt():
+    with A.app.app_context():
+        A.db.session.add_all([A.Product(title="Hot A", barcode="HOT-A", price=PRICE, stock=INITIAL),
+                              A.Product(title="Hot B", barcode="HOT-B", price=PRICE, stock=INITIAL)])
+        customer = A.Customer(name="Veresiye Müşteri", debt=0.0)
+        A.db.session.add(customer)
+        A.db.session.commit()
+        cust_id = customer.id
+        sales_before, orders_before = A.Sale.query.count(), A.Order.query.count()
+
+    errors = []
+    lock = threading.Lock()
+
+    def worker(n):
+        client = A.app.test_client()
+        for i in range(ITERATIONS):
+            if i % 2:  # POS yerel sepeti (items), veresiye
+                r = client.post("/api/cart/checkout", json={
+                    "items": [{"barcode": "HOT-A", "qty": 2}, {"barcode": "HOT-B", "qty": 1}],
+                    "payment": "veresiye", "customer_id": cust_id})
+            else:  # sunucu sepeti, nakit
+                client.post("/api/cart/add", json={"barcode": "HOT-A", "qty": 1})
+                client.post("/api/cart/add", json={"barcode": "HOT-B", "qty": 3})
+                r = client.post("/api/cart/checkout", json={"payment": "nakit"})
+            if r.status_code != 200 or not r.get_json().get("ok"):
+                with lock:
+                    errors.append(r.get_data(as_text=True)[:200])
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    cash = veresiye = THREADS * ITERATIONS // 2
+    sold = {"HOT-A": cash * 1 + veresiye * 2, "HOT-B": cash * 3 + veresiye * 1}
+    with A.app.app_context():
+        for code, qty in sold.items():
+            p = A.Product.query.filter_by(barcode=code).one()
+            assert p.stock == INITIAL - qty
+            assert A.db.session.query(A.db.func.sum(A.Sale.qty)).filter(A.Sale.product_id == p.id).scalar() == qty
+        assert A.Sale.query.count() - sales_before == 2 * (cash + veresiye)
+        assert A.Order.query.count() - orders_before == cash + veresiye
+        debt = A.db.session.get(A.Customer, cust_id).debt
+        assert debt == veresiye * 3 * PRICE
+
+
+def test_shared_cart_is_checked_out_once():
+    """Aynı X-Cart-Id sepetini birden çok terminal aynı anda kapatırsa yalnızca biri satar."""
+    rounds, terminals = 5, 4
+    with A.app.app_context():
+        p = A.Product(title="Shared", barcode="SHARED-1", price=PRICE, stock=INITIAL)
+        A.db.session.add(p)
+        A.db.session.commit()
+        pid = p.id
+
+    headers = {"X-Cart-Id": "shared-terminal-cart"}
+    results = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(terminals)
+
+    def terminal():
+        client = A.app.test_client()
+        barrier.wait()
+        r = client.post("/api/cart/checkout", json={"payment": "nakit"}, headers=headers)
+        with lock:
+            results.append(r.status_code)
+
+    for _ in range(rounds):
+        r = A.app.test_client().post("/api/cart/add", json={"barcode": "SHARED-1", "qty": 2}, headers=headers)
+        assert r.status_code == 200
+        threads = [threading.Thread(target=terminal) for _ in range(terminals)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert results.count(200) == rounds
+    assert results.count(400) == rounds * (terminals - 1)  # "Sepet boş"
+    with A.app.app_context():
+        assert A.db.session.get(A.Product, pid).stock == INITIAL - 2 * rounds
+        assert A.Sale.query.filter_by(product_id=pid).count() == rounds
@@ -0,0 +1,45 @@
+"""Outbox: aynı item için eski stok değeri yenisinden sonra gönderilmemeli."""
+from datetime import datetime, timedelta
+
+import requests
+
+import app as A
+
+
+class FakeClient:
+    def __init__(self):
+        self.fail, self.sent = False, []
+
+    def set_inventory(self, location_id, item_id, available):
+        if self.fail:
+            r = requests.Response()
+            r.status_code = 429
+            raise requests.HTTPError("429", response=r)
+        self.sent.append((item_id, available))
+
+
+def test_backed_off_row_does_not_overwrite_newer_value(monkeypatch):
+    fc = FakeClient()
+    monkeypatch.setattr(A, "shopify_client", lambda s: fc)
+    O = A.ShopifyOutbox
+    with A.app.app_context():
+        s = A.get_settings()
+        s.shop_url, s.api_token, s.location_id = "test.myshopify.com", "token", "1"
+        A.queue_shopify_stocks([("OUTBOX-1", 5)])
+        A.db.session.commit()
+
+        fc.fail = True
+        A.drain_outbox()  # 429 -> backoff ile pending
+        assert O.query.filter_by(inventory_item_id="OUTBOX-1", status="pending").count() == 1
+
+        A.queue_shopify_stocks([("OUTBOX-1", 4)])
+        A.db.session.commit()
+        fc.fail = False
+        A.drain_outbox()  # yeni değer vadesinde, eskisi hâlâ backoff'ta
+        # backoff dolsa bile eski kayıt gönderilmemeli
+        A.db.session.execute(A.db.update(O).values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1)))
+        A.db.session.commit()
+        A.drain_outbox()
+
+        assert fc.sent == [("OUTBOX-1", 4)]
+        assert {r.status for r in O.query.filter_by(inventory_item_id="OUTBOX-1")} == {"done"}
@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+
+# Render edilmiş çıktılar (PDF, sayfa vb.) için adet + toplam bayt sınırlı LRU.
+# max_items=0 önbelleği kapatır.
+
+class BytesLRU:
+    def __init__(self, max_items=512, max_bytes=32 * 1024 * 1024):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            val = self._data.get(key)
+            if val is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return val
+
+    def put(self, key, value):
+        if not self.max_items or len(value) > self.max_bytes:
+            return value
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._data[key] = value
+            self._bytes += len(value)
+            while self._data and (len(self._data) > self.max_items or self._bytes > self.max_bytes):
+                _, dropped = self._data.popitem(last=False)
+                self._bytes -= len(dropped)
+        return value
+
+    def get_or_render(self, key, render):
+        val = self.get(key)
+        return val if val is not None else self.put(key, render())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"size": len(self._data), "bytes": self._bytes, "max_items": self.max_items,
+                "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0}
@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+# Sunucu tarafı sepet: cookie'de sadece cart_id taşınır, satırlar burada tutulur.
+# Tüm store'lar aynı arayüzü sağlar; satır = {product_id, title, barcode, price, qty}.
+
+def totals_of(lines):
+    qty = sum(int(i["qty"]) for i in lines)
+    amount = sum(float(i["qty"]) * float(i["price"]) for i in lines)
+    return {"qty": qty, "amount": round(amount, 2)}
+
+
+class MemoryCartStore:
+    """Tek süreç için LRU + TTL bellek store'u (gunicorn'da tek worker ile kullanın)."""
+
+    transactional = False  # DB transaction'ına katılmaz
+
+    def __init__(self, max_carts=1000, ttl_seconds=12 * 3600):
+        self.max_carts = max_carts
+        self.ttl = ttl_seconds
+        self._carts = OrderedDict()  # cart_id -> (son erişim, OrderedDict(pid -> satır))
+        self._lock = threading.Lock()
+
+    def _cart(self, cart_id, create=False):
+        now = time.monotonic()
+        entry = self._carts.get(cart_id)
+        if entry and now - entry[0] > self.ttl:
+            del self._carts[cart_id]
+            entry = None
+        if entry is None:
+            if not create:
+                return None
+            entry = (now, OrderedDict())
+            while len(self._carts) >= self.max_carts:
+                self._carts.popitem(last=False)
+        self._carts[cart_id] = (now, entry[1])
+        self._carts.move_to_end(cart_id)
+        return entry[1]
+
+    def lines(self, cart_id):
+        with self._lock:
+            cart = self._cart(cart_id)
+            return [dict(i) for i in cart.values()] if cart else []
+
+    def add(self, cart_id, item, qty):
+        with self._lock:
+            cart = self._cart(cart_id, create=True)
+            line = cart.get(item["product_id"])
+            if line:
+                line["qty"] += qty
+            else:
+                line = cart[item["product_id"]] = dict(item, qty=qty)
+            return dict(line)
+
+    def set_qty(self, cart_id, product_id, qty):
+        """Yeni satırı döner; qty<=0 ise satırı siler ve None döner. Satır yoksa KeyError."""
+        with self._lock:
+            cart = self._cart(cart_id)
+            if not cart or product_id not in cart:
+                raise KeyError(product_id)
+            if qty <= 0:
+                del cart[product_id]
+                return None
+            cart[product_id]["qty"] = qty
+            return dict(cart[product_id])
+
+    def remove(self, cart_id, product_id):
+        with self._lock:
+            cart = self._cart(cart_id)
+            if cart:
+                cart.pop(product_id, None)
+
+    def clear(self, cart_id):
+        with self._lock:
+            self._carts.pop(cart_id, None)
+
+    def take(self, cart_id):
+        """Sepeti tek adımda boşaltıp satırlarını döner (checkout sahiplenmesi)."""
+        with self._lock:
+            entry = self._carts.pop(cart_id, None)
+            return [dict(i) for i in entry[1].values()] if entry else []
+
+    def totals(self, cart_id):
+        return totals_of(self.lines(cart_id))
+
+
+class SqlCartStore:
+    """Veritabanı store'u: çoklu worker/terminal aynı sepeti paylaşabilir.
+
+    Adet değişiklikleri `qty = qty + :n` şeklinde atomiktir. Yazma işlemleri
+    çağıranın transaction'ına katılır; commit çağırana aittir.
+    """
+
+    FIELDS = ("product_id", "title", "barcode", "price", "qty")
+    transactional = True  # satış kaydıyla aynı commit'te temizlenir
+
+    def __init__(self, session, model, ttl_seconds=12 * 3600):
+        self.session = session
+        self.model = model
+        self.ttl = ttl_seconds
+        self._last_purge = 0.0
+
+    def _row(self, r):
+        return {k: getattr(r, k) for k in self.FIELDS}
+
+    def _get(self, cart_id, product_id):
+        m = self.model
+        q = select(m).where(m.cart_id == cart_id, m.product_id == product_id)\
+            .execution_options(populate_existing=True)
+        return self.session.execute(q).scalar_one_or_none()
+
+    def lines(self, cart_id):
+        m = self.model
+        rows = self.session.execute(select(m).where(m.cart_id == cart_id).order_by(m.id)).scalars()
+        return [self._row(r) for r in rows]
+
+    def add(self, cart_id, item, qty):
+        m = self.model
+        now = datetime.utcnow()
+        bump = update(m).where(m.cart_id == cart_id, m.product_id == item["product_id"])\
+            .values(qty=m.qty + qty, updated_at=now)
+        if not self.session.execute(bump).rowcount:
+            try:
+                with self.session.begin_nested():
+                    self.session.add(m(cart_id=cart_id, qty=qty, updated_at=now,
+                                       **{k: item[k] for k in self.FIELDS if k != "qty"}))
+            except IntegrityError:
+                # Başka terminal aynı anda ekledi
+                self.session.execute(bump)
+        return self._row(self._get(cart_id, item["product_id"]))
+
+    def set_qty(self, cart_id, product_id, qty):
+        m = self.model
+        where = (m.cart_id == cart_id, m.product_id == product_id)
+        if qty <= 0:
+            if not self.session.execute(delete(m).where(*where)).rowcount:
+                raise KeyError(product_id)
+            return None
+        if not self.session.execute(update(m).where(*where).values(qty=qty, updated_at=datetime.utcnow())).rowcount:
+            raise KeyError(product_id)
+        return self._row(self._get(cart_id, product_id))
+
+    def remove(self, cart_id, product_id):
+        m = self.model
+        self.session.execute(delete(m).where(m.cart_id == cart_id, m.product_id == product_id))
+
+    def _purge(self):
+        # Terk edilmiş sepetleri saatte bir temizle
+        if time.monotonic() - self._last_purge > 3600:
+            self._last_purge = time.monotonic()
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+            self.session.execute(delete(self.model).where(self.model.updated_at < cutoff))
+
+    def clear(self, cart_id):
+        m = self.model
+        self.session.execute(delete(m).where(m.cart_id == cart_id))
+        self._purge()
+
+    def take(self, cart_id):
+        """Satırları tek DELETE ... RETURNING ile sahiplenir: aynı sepeti paylaşan iki terminalden
+        yalnızca biri satırları alır, diğeri boş sepet görür. Geri alınırsa sepet geri gelir."""
+        m = self.model
+        rows = self.session.execute(delete(m).where(m.cart_id == cart_id)
+                                    .returning(m.id, *(getattr(m, k) for k in self.FIELDS))).all()
+        self._purge()
+        return [{k: getattr(r, k) for k in self.FIELDS} for r in sorted(rows, key=lambda r: r.id)]
+
+    def totals(self, cart_id):
+        m = self.model
+        qty, amount = self.session.execute(
+            select(func.coalesce(func.sum(m.qty), 0), func.coalesce(func.sum(m.qty * m.price), 0.0))
+            .where(m.cart_id == cart_id)).one()
+        return {"qty": int(qty), "amount": round(float(amount), 2)}
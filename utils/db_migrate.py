@@ -0,0 +1,31 @@
+from sqlalchemy import inspect, text
+
+# db.create_all() mevcut tabloları değiştirmez. Bu hafif migrasyon adımı
+# modelde olup veritabanında olmayan kolonları (ALTER TABLE ADD COLUMN) ve
+# index'leri ekler. Kolon silme/tip değiştirme yapmaz.
+
+def _add_column_sql(engine, table, col):
+    coltype = col.type.compile(dialect=engine.dialect)
+    prep = engine.dialect.identifier_preparer
+    return f"ALTER TABLE {prep.quote(table.name)} ADD COLUMN {prep.quote(col.name)} {coltype}"
+
+def upgrade(engine, metadata):
+    """Eksik kolon ve index'leri ekler; uygulanan değişikliklerin listesini döner."""
+    applied = []
+    insp = inspect(engine)
+    tables = set(insp.get_table_names())
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing_cols = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name not in existing_cols:
+                    conn.execute(text(_add_column_sql(engine, table, col)))
+                    applied.append(f"{table.name}.{col.name}")
+            existing_idx = {i["name"] for i in insp.get_indexes(table.name)}
+            for idx in table.indexes:
+                if idx.name not in existing_idx:
+                    idx.create(bind=conn, checkfirst=True)
+                    applied.append(idx.name)
+    return applied
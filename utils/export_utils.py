@@ -0,0 +1,37 @@
+import csv
+from datetime import datetime
+from io import StringIO
+
+# Akışlı CSV: satırlar parça parça metne çevrilir, tüm sonuç bellekte birikmez.
+# Excel (tr) için ';' ayraç ve UTF-8 BOM.
+
+_FORMULA = ("=", "+", "-", "@")
+
+def _cell(v):
+    if v is None:
+        return ""
+    if isinstance(v, datetime):
+        return v.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(v, bool):
+        return "Evet" if v else "Hayır"
+    if isinstance(v, float):
+        return f"{v:.2f}"
+    if isinstance(v, str) and v.startswith(_FORMULA):
+        return "'" + v  # Excel formül enjeksiyonuna karşı
+    return v
+
+def csv_chunks(header, rows, flush_every=500, delimiter=";"):
+    """header + rows -> CSV metin parçaları (en fazla flush_every satırlık)."""
+    buf = StringIO()
+    w = csv.writer(buf, delimiter=delimiter)
+    buf.write("\ufeff")
+    w.writerow(header)
+    n = 0
+    for row in rows:
+        w.writerow([_cell(v) for v in row])
+        n += 1
+        if n % flush_every == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
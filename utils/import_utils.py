@@ -0,0 +1,79 @@
+import csv
+import io
+
+# Toplu ürün içe aktarma: CSV yükleme akışından satır satır okunur, doğrulanır,
+# dosya içi barkod tekrarları bellekte elenir. DB işi çağırana aittir.
+
+HEADER_ALIASES = {
+    "title": ("title", "ad", "ürün", "urun", "ürün adı", "urun adi", "name"),
+    "barcode": ("barcode", "barkod"),
+    "price": ("price", "fiyat"),
+    "stock": ("stock", "stok", "adet", "qty"),
+}
+MAX_ERRORS = 200
+
+def _number(v, cast):
+    v = (v or "").strip().replace(" ", "")
+    if not v:
+        return cast(0)
+    if "," in v and "." in v:       # 1.234,50
+        v = v.replace(".", "").replace(",", ".")
+    elif "," in v:                  # 12,50
+        v = v.replace(",", ".")
+    return cast(float(v)) if cast is int else cast(v)
+
+def _columns(fieldnames):
+    cols = {}
+    for name in fieldnames or ():
+        key = (name or "").strip().lower()
+        for field, aliases in HEADER_ALIASES.items():
+            if key in aliases and field not in cols:
+                cols[field] = name
+    return cols
+
+def read_product_csv(stream, encoding="utf-8-sig"):
+    """Yüklenen dosya akışı -> (satırlar, hatalar).
+
+    satır: {"line", "title", "barcode" (None olabilir), "price", "stock"}
+    hata: (satır no, mesaj); en fazla MAX_ERRORS tutulur.
+    """
+    text = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    sample = text.readline()
+    delimiter = ";" if sample.count(";") > sample.count(",") else ","
+    reader = csv.DictReader([sample], delimiter=delimiter)
+    cols = _columns(reader.fieldnames)
+    if "title" not in cols:
+        return [], [(1, "Başlıkta 'ad'/'title' kolonu yok")]
+    reader = csv.DictReader(text, fieldnames=reader.fieldnames, delimiter=delimiter)
+
+    rows, errors, seen = [], [], {}
+    def err(line, msg):
+        if len(errors) < MAX_ERRORS:
+            errors.append((line, msg))
+
+    for line, rec in enumerate(reader, start=2):
+        title = (rec.get(cols["title"]) or "").strip()
+        if not title:
+            if any((v or "").strip() for v in rec.values() if isinstance(v, str)):
+                err(line, "Ürün adı boş")
+            continue
+        barcode = ((rec.get(cols["barcode"]) or "").strip() or None) if "barcode" in cols else None
+        try:
+            price = _number(rec.get(cols["price"]), float) if "price" in cols else 0.0
+            stock = _number(rec.get(cols["stock"]), int) if "stock" in cols else 0
+        except ValueError:
+            err(line, "Fiyat/stok sayı değil")
+            continue
+        if price < 0:
+            err(line, "Fiyat negatif")
+            continue
+        if barcode:
+            if len(barcode) > 64:
+                err(line, "Barkod 64 karakterden uzun")
+                continue
+            if barcode in seen:
+                err(line, f"Barkod dosyada tekrar ediyor ({seen[barcode]}. satır)")
+                continue
+            seen[barcode] = line
+        rows.append({"line": line, "title": title[:255], "barcode": barcode, "price": price, "stock": stock})
+    return rows, errors
@@ -0,0 +1,126 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Süreç içi metrikler (sayaç + histogram), Prometheus text formatında sunulur.
+# Kayıt sadece sözlük + kilit; istek başına maliyeti mikro saniye düzeyinde.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _fmt_labels(key, extra=()):
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+def _num(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Metrics:
+    def __init__(self, prefix="stokk"):
+        self.prefix = prefix
+        self._meta = {}      # ad -> (tip, açıklama, bucket'lar)
+        self._counters = {}  # (ad, etiketler) -> değer
+        self._hists = {}     # (ad, etiketler) -> [bucket sayıları..., +Inf], toplam
+        self._gauges = {}    # ad -> fn() -> sayı veya {etiket sözlüğü tuple: sayı}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help):
+        self._meta[name] = ("counter", help, None)
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS):
+        self._meta[name] = ("histogram", help, tuple(buckets))
+
+    def gauge(self, name, help, fn):
+        self._meta[name] = ("gauge", help, None)
+        self._gauges[name] = fn
+
+    def inc(self, name, n=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def observe(self, name, value, **labels):
+        buckets = self._meta[name][2]
+        key = (name, _labels_key(labels))
+        i = bisect_left(buckets, value)
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                h = self._hists[key] = [[0] * (len(buckets) + 1), 0.0]
+            h[0][i] += 1
+            h[1] += value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            hists = {k: ([*v[0]], v[1]) for k, v in self._hists.items()}
+        out = []
+        for name, (kind, help, buckets) in sorted(self._meta.items()):
+            full = f"{self.prefix}_{name}"
+            out.append(f"# HELP {full} {help}")
+            out.append(f"# TYPE {full} {kind}")
+            if kind == "counter":
+                for (n, key), v in sorted(counters.items()):
+                    if n == name:
+                        out.append(f"{full}{_fmt_labels(key)} {_num(v)}")
+            elif kind == "histogram":
+                for (n, key), (counts, total) in sorted(hists.items()):
+                    if n != name:
+                        continue
+                    acc = 0
+                    for b, c in zip(buckets + ("+Inf",), counts):
+                        acc += c
+                        le = b if b == "+Inf" else _num(b)
+                        out.append(f"{full}_bucket{_fmt_labels(key, [('le', str(le))])} {acc}")
+                    out.append(f"{full}_sum{_fmt_labels(key)} {_num(total)}")
+                    out.append(f"{full}_count{_fmt_labels(key)} {acc}")
+            else:
+                try:
+                    val = self._gauges[name]()
+                except Exception:
+                    continue
+                if isinstance(val, dict):
+                    for lbl, v in sorted(val.items()):
+                        out.append(f"{full}{_fmt_labels(tuple(lbl))} {_num(v)}")
+                else:
+                    out.append(f"{full} {_num(val)}")
+        return "\n".join(out) + "\n"
+
+
+class QueryTracker:
+    """Thread başına (istek boyunca) SQL sorgu sayısı ve toplam süresi."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def start(self):
+        self._local.count, self._local.seconds, self._local.active = 0, 0.0, True
+
+    def add(self, seconds):
+        loc = self._local
+        if getattr(loc, "active", False):
+            loc.count += 1
+            loc.seconds += seconds
+
+    def stop(self):
+        loc = self._local
+        if not getattr(loc, "active", False):
+            return 0, 0.0
+        loc.active = False
+        return loc.count, loc.seconds
@@ -0,0 +1,73 @@
+import base64
+import json
+from sqlalchemy import and_, func, or_
+
+# Keyset (seek) sayfalama + DataTables server-side protokolü yardımcıları.
+# Sıralama her zaman (sıralama kolonu, id) çiftidir; cursor son satırın bu
+# iki değerini taşır, sonraki sayfa OFFSET yerine WHERE ile başlar.
+
+MAX_PAGE = 500
+
+def encode_cursor(sort_value, row_id):
+    raw = json.dumps([sort_value, row_id], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Bozuk cursor'da None döner (çağıran OFFSET'e düşer)."""
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor + pad))
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+def table_params(args, sortable, default_sort):
+    """DataTables (draw/start/length/search[value]/order[0][...]) veya sade API
+    (q/limit/sort/dir/cursor) parametrelerini tek sözlüğe çevirir."""
+    def to_int(v, default):
+        try:
+            return int(v)
+        except (TypeError, ValueError):
+            return default
+
+    sort = args.get("sort")
+    if sort is None and args.get("order[0][column]") is not None:
+        sort = args.get(f"columns[{to_int(args.get('order[0][column]'), 0)}][data]")
+    direction = args.get("dir") or args.get("order[0][dir]") or "asc"
+    length = to_int(args.get("limit") or args.get("length"), 50)
+    return {
+        "draw": to_int(args.get("draw"), 0),
+        "start": max(0, to_int(args.get("start"), 0)),
+        "limit": MAX_PAGE if length < 0 else max(1, min(length, MAX_PAGE)),
+        "search": (args.get("q") or args.get("search[value]") or "").strip(),
+        "sort": sort if sort in sortable else default_sort,
+        "desc": direction.lower() == "desc",
+        "cursor": args.get("cursor") or None,
+    }
+
+def keyset_page(query, sort_col, id_col, desc=False, limit=50, cursor=None, offset=0):
+    """query: kolon seçen Query. (satırlar, sonraki cursor) döner.
+
+    Cursor varsa seek koşulu kullanılır; yoksa (DataTables'ta rastgele sayfaya
+    atlama) OFFSET'e düşülür. sort_col NULL içermemeli (coalesce verin).
+    """
+    q = query.add_columns(sort_col.label("_sort"))
+    pos = decode_cursor(cursor) if cursor else None
+    if pos:
+        v, last_id = pos
+        if desc:
+            q = q.filter(or_(sort_col < v, and_(sort_col == v, id_col < last_id)))
+        else:
+            q = q.filter(or_(sort_col > v, and_(sort_col == v, id_col > last_id)))
+    order = (sort_col.desc(), id_col.desc()) if desc else (sort_col.asc(), id_col.asc())
+    q = q.order_by(*order)
+    if not pos and offset:
+        q = q.offset(offset)
+    rows = q.limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    nxt = encode_cursor(rows[-1]._sort, rows[-1].id) if more and rows else None
+    return [{k: v for k, v in r._mapping.items() if k != "_sort"} for r in rows], nxt
+
+def count_rows(session, id_col, *filters):
+    return session.query(func.count(id_col)).filter(*filters).scalar() or 0
@@ -1,16 +1,14 @@
 import os
+from functools import lru_cache
+from io import BytesIO
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import landscape, A7
+from reportlab.lib.pagesizes import landscape, A4, A7
+from reportlab.graphics.barcode import code128
 from reportlab.lib.utils import ImageReader
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
-def ensure_dir(path):
-    d = os.path.dirname(path)
-    if d and not os.path.exists(d):
-        os.makedirs(d, exist_ok=True)
-
 # Türkçe karakterleri PDF'in varsayılan fontlarına uygun hâle çevir
 def tr_safe(text: str) -> str:
     if not text:
@@ -25,6 +23,8 @@ def tr_safe(text: str) -> str:
     return txt
 
 # İstersen Unicode font kullan (DejaVuSans.ttf koyarsan otomatik seçer)
+# Font süreç başına bir kez kaydedilir.
+@lru_cache(maxsize=1)
 def pick_font():
     here = os.path.dirname(__file__)
     ttf = os.path.join(here, "DejaVuSans.ttf")  # dosyayı koyarsan devreye girer
@@ -36,15 +36,9 @@ def pick_font():
             pass
     return "Helvetica"  # fallback
 
-def label_pdf(code, name, price, barcode_png_path, pdf_path):
-    ensure_dir(barcode_png_path)
-    ensure_dir(pdf_path)
-
-    # Yazı tipi
+def _draw_png_label(c, code, name, price, img):
+    """A7 yatay sayfaya eski (PNG barkodlu) etiket düzenini çizer; img: ImageReader."""
     font = pick_font()
-
-    # Canvas
-    c = canvas.Canvas(pdf_path, pagesize=landscape(A7))
     w, h = landscape(A7)
 
     # Ürün adı (Türkçe karakterleri güvenli yaz)
@@ -60,7 +54,6 @@ def label_pdf(code, name, price, barcode_png_path, pdf_path):
 
     # Barkod görseli
     y -= 25*mm
-    img = ImageReader(barcode_png_path)
     c.drawImage(img, 8*mm, y, width=60*mm, height=20*mm, preserveAspectRatio=True, mask='auto')
 
     # Barkod yazısı
@@ -69,4 +62,68 @@ def label_pdf(code, name, price, barcode_png_path, pdf_path):
 
     c.showPage()
     c.save()
-    return pdf_path
+
+def label_pdf_png_bytes(code, name, price, png_bytes):
+    """Aynı PNG'li etiket, tamamen bellekte: PNG baytları -> ImageReader -> PDF baytları."""
+    buf = BytesIO()
+    c = canvas.Canvas(buf, pagesize=landscape(A7))
+    _draw_png_label(c, code, name, price, ImageReader(BytesIO(png_bytes)))
+    return buf.getvalue()
+
+
+# ---- Vektör etiket (PNG ara adımı yok) ----
+def _fonts():
+    font = pick_font()
+    if font == "Helvetica":
+        return font, "Helvetica-Bold"
+    return font, font  # kalın varyant kayıtlı değil
+
+def draw_label(c, x, y, w, h, code, name, price):
+    """(x, y) sol-alt köşeli w×h kutuya tek etiket çizer; barkod doğrudan canvas'a vektör olarak."""
+    font, bold = _fonts()
+    safe_name = name if font != "Helvetica" else tr_safe(name)
+    pad = min(4 * mm, w * 0.06)
+    name_size = max(6, min(12, h / 5))
+    c.setFont(bold, name_size)
+    c.drawString(x + pad, y + h - pad - name_size, (safe_name or "")[:int(w / (name_size * 0.5))])
+    c.setFont(font, name_size * 0.9)
+    c.drawString(x + pad, y + h - pad - name_size * 2.1, f"{(price or 0):.2f} ₺" if font != "Helvetica"
+                 else f"{(price or 0):.2f} TL")
+
+    text_size = max(5, name_size * 0.7)
+    bar_h = max(6 * mm, min(20 * mm, h - pad * 2 - name_size * 2.4 - text_size * 1.6))
+    probe = code128.Code128(code, barWidth=1, barHeight=bar_h, quiet=False)
+    bar_w = min(0.5 * mm, (w - 2 * pad) / probe.width)
+    bc = code128.Code128(code, barWidth=bar_w, barHeight=bar_h, quiet=False)
+    bc.drawOn(c, x + pad, y + pad + text_size * 1.4)
+    c.setFont(font, text_size)
+    c.drawString(x + pad, y + pad, code)
+
+def label_sheet_pdf(items, cols=3, rows=8, pagesize=A4, margin=8 * mm):
+    """items: (barkod, ad, fiyat) dizisi -> çok sayfalı, sayfa başına cols×rows etiketli PDF baytları."""
+    buf = BytesIO()
+    c = canvas.Canvas(buf, pagesize=pagesize)
+    pw, ph = pagesize
+    cw, ch = (pw - 2 * margin) / cols, (ph - 2 * margin) / rows
+    per_page = cols * rows
+    n = 0
+    for code, name, price in items:
+        if n and n % per_page == 0:
+            c.showPage()
+        slot = n % per_page
+        col, row = slot % cols, slot // cols
+        draw_label(c, margin + col * cw, ph - margin - (row + 1) * ch, cw, ch, code, name, price)
+        n += 1
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+def label_pdf_bytes(code, name, price):
+    """Tek A7 etiket PDF'i (vektör)."""
+    buf = BytesIO()
+    size = landscape(A7)
+    c = canvas.Canvas(buf, pagesize=size)
+    draw_label(c, 0, 0, size[0], size[1], code, name, price)
+    c.showPage()
+    c.save()
+    return buf.getvalue()
@@ -0,0 +1,58 @@
+import threading
+
+# Barkod okuma sıcak yolu için süreç içi ürün özeti önbelleği.
+# ORM nesnesi yerine sadece id/başlık/barkod/fiyat tutulur.
+
+class ProductSnap:
+    __slots__ = ("id", "title", "barcode", "price")
+
+    def __init__(self, id, title, barcode, price):
+        self.id = id
+        self.title = title
+        self.barcode = barcode
+        self.price = float(price or 0)
+
+
+class BarcodeCache:
+    def __init__(self):
+        self._by_barcode = {}
+        self._barcode_of = {}  # id -> barcode (barkod değişince eski anahtarı silmek için)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.warmed = False
+
+    def warm(self, rows):
+        """rows: (id, title, barcode, price) demetleri; önbelleği tek seferde değiştirir."""
+        by_barcode, barcode_of = {}, {}
+        for pid, title, barcode, price in rows:
+            if barcode:
+                by_barcode[barcode] = ProductSnap(pid, title, barcode, price)
+                barcode_of[pid] = barcode
+        with self._lock:
+            self._by_barcode, self._barcode_of = by_barcode, barcode_of
+            self.warmed = True
+        return len(by_barcode)
+
+    def get(self, barcode):
+        snap = self._by_barcode.get(barcode)
+        # Sayaçlar kilitsiz; kaba istatistik için yeterli
+        if snap is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return snap
+
+    def put(self, pid, title, barcode, price):
+        with self._lock:
+            old = self._barcode_of.pop(pid, None)
+            if old and self._by_barcode.get(old) and self._by_barcode[old].id == pid:
+                del self._by_barcode[old]
+            if barcode:
+                self._by_barcode[barcode] = ProductSnap(pid, title, barcode, price)
+                self._barcode_of[pid] = barcode
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"size": len(self._by_barcode), "hits": self.hits, "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0, "warmed": self.warmed}
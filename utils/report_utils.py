@@ -0,0 +1,52 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+
+# Rapor yardımcıları: her tablo için tek GROUP BY sorgusu, yarı açık [start, end) aralık.
+# Filtre kolonun kendisine uygulanır (func.date(...) WHERE'de kullanılmaz -> index çalışır).
+
+def day_bounds(first_day, last_day):
+    """[first_day 00:00, last_day+1 00:00) datetime aralığı."""
+    start = datetime(first_day.year, first_day.month, first_day.day)
+    end = datetime(last_day.year, last_day.month, last_day.day) + timedelta(days=1)
+    return start, end
+
+def _as_date(v):
+    # SQLite date() string döner, Postgres date döner
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    return date.fromisoformat(str(v)[:10])
+
+def daily_sums(session, ts_col, value_col, start, end, *filters):
+    """{gün: toplam} — tek sorgu."""
+    day = func.date(ts_col)
+    rows = session.query(day, func.coalesce(func.sum(value_col), 0.0))\
+        .filter(ts_col >= start, ts_col < end, *filters)\
+        .group_by(day).all()
+    return {_as_date(d): float(v or 0) for d, v in rows}
+
+def days(first_day, last_day):
+    d = first_day
+    while d <= last_day:
+        yield d
+        d += timedelta(days=1)
+
+def series(first_day, last_day, *daily):
+    """Gün gün etiket + (birden fazla günlük sözlüğün toplamı) değer listesi."""
+    labels, values = [], []
+    for d in days(first_day, last_day):
+        labels.append(d.strftime("%d.%m"))
+        values.append(sum(s.get(d, 0.0) for s in daily))
+    return labels, values
+
+def range_total(first_day, last_day, *daily):
+    return sum(v for s in daily for d, v in s.items() if first_day <= d <= last_day)
+
+def daily_grouped_sums(session, ts_col, key_col, value_cols, start, end, *filters):
+    """{(gün, anahtar): [toplam, ...]} — tek sorgu (rollup yeniden hesaplama için)."""
+    day = func.date(ts_col)
+    sums = [func.coalesce(func.sum(c), 0) for c in value_cols]
+    q = session.query(day, key_col, *sums).filter(ts_col >= start, ts_col < end, *filters)\
+        .group_by(day, key_col)
+    return {(_as_date(r[0]), r[1]): list(r[2:]) for r in q.all()}
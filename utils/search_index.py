@@ -0,0 +1,152 @@
+import heapq
+from itertools import islice
+import threading
+from bisect import bisect_left, insort
+from utils.text_utils import tr_fold
+
+# Ürün araması için süreç içi ters index: kelime -> {ürün id}.
+# Sorgu kelimeleri önek olarak eşlenir (sıralı sözlükte bisect), sonuçlar kesişir.
+# Ürün eklendikçe/değiştikçe put() ile artımlı güncellenir.
+
+def _doc(title, barcode, price):
+    """(başlık, barkod, fiyat, katlanmış başlık, kelimeler)"""
+    folded = tr_fold(title)
+    toks = set(folded.split())
+    if barcode:
+        toks.add(barcode.lower())
+    return title, barcode, float(price or 0), folded, tuple(toks)
+
+
+class ProductIndex:
+    def __init__(self):
+        self._postings = {}  # kelime -> set(id)
+        self._vocab = []     # sıralı kelimeler (önek araması)
+        self._docs = {}      # id -> (başlık, barkod, fiyat, katlanmış başlık, kelimeler)
+        self._folded = {}    # id -> katlanmış başlık (sıralama anahtarı)
+        self._titles = []    # sıralı (katlanmış başlık, id): başlık öneki aralığı
+        self._lock = threading.RLock()
+        self.warmed = False
+
+    def warm(self, rows):
+        """rows: (id, title, barcode, price); index'i tek seferde yeniden kurar."""
+        postings, docs = {}, {}
+        for pid, title, barcode, price in rows:
+            doc = docs[pid] = _doc(title, barcode, price)
+            for t in doc[4]:
+                postings.setdefault(t, set()).add(pid)
+        vocab = sorted(postings)
+        folded = {pid: d[3] for pid, d in docs.items()}
+        titles = sorted((f, pid) for pid, f in folded.items())
+        with self._lock:
+            self._postings, self._vocab, self._docs = postings, vocab, docs
+            self._folded, self._titles = folded, titles
+            self.warmed = True
+        return len(docs)
+
+    def _remove(self, pid):
+        doc = self._docs.pop(pid, None)
+        if not doc:
+            return
+        del self._folded[pid]
+        i = bisect_left(self._titles, (doc[3], pid))
+        if i < len(self._titles) and self._titles[i] == (doc[3], pid):
+            del self._titles[i]
+        for t in doc[4]:
+            ids = self._postings.get(t)
+            if ids is None:
+                continue
+            ids.discard(pid)
+            if not ids:
+                del self._postings[t]
+                i = bisect_left(self._vocab, t)
+                if i < len(self._vocab) and self._vocab[i] == t:
+                    del self._vocab[i]
+
+    def put(self, pid, title, barcode, price):
+        with self._lock:
+            self._remove(pid)
+            if title is None:
+                return
+            doc = self._docs[pid] = _doc(title, barcode, price)
+            self._folded[pid] = doc[3]
+            insort(self._titles, (doc[3], pid))
+            for t in doc[4]:
+                ids = self._postings.get(t)
+                if ids is None:
+                    self._postings[t] = {pid}
+                    insort(self._vocab, t)
+                else:
+                    ids.add(pid)
+
+    def _span(self, prefix):
+        lo = bisect_left(self._vocab, prefix)
+        return lo, bisect_left(self._vocab, prefix + "\uffff", lo)
+
+    def _estimate(self, prefix):
+        """(lo, hi, tahmini eşleşme sayısı, önek); çok kelimeye açılan önek katalog kadar sayılır."""
+        lo, hi = self._span(prefix)
+        est = sum(len(self._postings[t]) for t in self._vocab[lo:hi]) if hi - lo <= 64 else len(self._docs)
+        return lo, hi, est, prefix
+
+    def _ids(self, lo, hi):
+        if hi - lo == 1:
+            return self._postings[self._vocab[lo]]
+        return set().union(*(self._postings[t] for t in self._vocab[lo:hi]))
+
+    def search(self, query, limit=20):
+        """[(id, başlık, barkod, fiyat)]; tam barkod > başlık öneki > alfabetik."""
+        terms = tr_fold(query).split()
+        if not terms:
+            return []
+        with self._lock:
+            # Küçük kümeden başlayıp kesiştir; adaylardan çok daha geniş önekler
+            # ("s", "ms0") birleşim kurmak yerine adayların kelimelerinde kontrol edilir
+            spans = sorted((self._estimate(t) for t in set(terms)), key=lambda x: x[2])
+            ids = None
+            wide = []
+            for lo, hi, est, t in spans:
+                if ids is not None and est > 64 * len(ids):
+                    wide.append(t)
+                    continue
+                cur = self._ids(lo, hi)
+                ids = cur if ids is None else (ids & cur if len(ids) <= len(cur) else cur & ids)
+                if not ids:
+                    return []
+            if wide:
+                docs = self._docs
+                ids = {pid for pid in ids
+                       if all(any(tok.startswith(t) for tok in docs[pid][4]) for t in wide)}
+            docs = self._docs
+            q = " ".join(terms)
+            code = query.strip().lower()
+
+            # 1) tam barkod eşleşmesi
+            out = [pid for pid in self._postings.get(code, ()) if pid in ids
+                   and (docs[pid][1] or "").lower() == code]
+            # 2) başlığı sorguyla başlayanlar: sıralı başlık listesinde tek aralık
+            i = bisect_left(self._titles, (q,))
+            while len(out) < limit and i < len(self._titles) and self._titles[i][0].startswith(q):
+                pid = self._titles[i][1]
+                if pid in ids and pid not in out:
+                    out.append(pid)
+                i += 1
+            # 3) kalanlar alfabetik: aday kümesi yoğunsa sıralı listeyi baştan tara,
+            #    seyrekse (veya tarama uzarsa) adaylar içinden en küçükleri seç
+            if len(out) < limit:
+                seen = set(out)
+                need = limit - len(out)
+                rest = []
+                if len(ids) * 64 >= len(self._titles):
+                    for _, pid in islice(self._titles, 2 * len(ids)):
+                        if pid in ids and pid not in seen:
+                            rest.append(pid)
+                            if len(rest) == need:
+                                break
+                if len(rest) < need and len(rest) < len(ids) - len(seen):
+                    rest = [pid for pid in heapq.nsmallest(limit, ids, key=self._folded.__getitem__)
+                            if pid not in seen][:need]
+                out += rest
+            return [(pid,) + docs[pid][:3] for pid in out]
+
+    def stats(self):
+        return {"products": len(self._docs), "terms": len(self._vocab), "warmed": self.warmed}
@@ -1,23 +1,166 @@
+import threading
+import time
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
+
+API_VERSION = "2024-04"
 
 def _headers(token):
     return {"X-Shopify-Access-Token": token, "Content-Type":"application/json"}
 
-def fetch_locations(shop, token):
-    url = f"https://{shop}/admin/api/2024-04/locations.json"
-    r = requests.get(url, headers=_headers(token), timeout=30)
-    r.raise_for_status()
-    return r.json().get("locations", [])
-
-def fetch_products(shop, token, limit=100):
-    url = f"https://{shop}/admin/api/2024-04/products.json?limit={limit}"
-    r = requests.get(url, headers=_headers(token), timeout=60)
-    r.raise_for_status()
-    return r.json().get("products", [])
-
-def set_inventory(shop, token, location_id, inventory_item_id, new_qty):
-    url = f"https://{shop}/admin/api/2024-04/inventory_levels/set.json"
-    payload = {"location_id": int(location_id), "inventory_item_id": int(inventory_item_id), "available": int(new_qty)}
-    r = requests.post(url, headers=_headers(token), json=payload, timeout=30)
-    r.raise_for_status()
-    return r.json()
+
+class CallLimiter:
+    """X-Shopify-Shop-Api-Call-Limit ("32/40") başlığıyla beslenen leaky bucket.
+
+    Son görülen doluluk saniyede `leak_per_sec` kadar boşalır; tahmini doluluk
+    kapasite - reserve seviyesine ulaştıysa istekten önce beklenir.
+    """
+
+    def __init__(self, reserve=4, leak_per_sec=2.0):
+        self.reserve = reserve
+        self.leak_per_sec = leak_per_sec
+        self._used = 0.0
+        self._cap = None
+        self._at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _level(self, now):
+        return max(0.0, self._used - (now - self._at) * self.leak_per_sec)
+
+    def wait(self):
+        with self._lock:
+            if self._cap is None:
+                return 0.0
+            now = time.monotonic()
+            over = self._level(now) + 1 - (self._cap - self.reserve)
+            delay = over / self.leak_per_sec if over > 0 else 0.0
+            # Bekleyen istek kovaya eklenmiş sayılır (paralel thread'ler sıraya girer)
+            self._used = self._level(now) + 1
+            self._at = now
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    def update(self, resp):
+        hdr = resp.headers.get("X-Shopify-Shop-Api-Call-Limit")
+        if not hdr:
+            return
+        try:
+            used, cap = (int(x) for x in hdr.split("/"))
+        except ValueError:
+            return
+        with self._lock:
+            self._used, self._cap, self._at = float(used), cap, time.monotonic()
+
+
+class ShopifyClient:
+    """Keep-alive oturumlu, hız sınırına uyan Admin REST istemcisi.
+
+    base_url verilirse (ör. http://127.0.0.1:8765/admin/api/2024-04) yerel stub
+    sunucuya bağlanır.
+    """
+
+    def __init__(self, shop, token, base_url=None, pool_maxsize=8, timeout=30,
+                 limiter=None, session=None, on_request=None):
+        self.shop = shop
+        self.base_url = (base_url or f"https://{shop}/admin/api/{API_VERSION}").rstrip("/")
+        self.timeout = timeout
+        self.limiter = limiter or CallLimiter()
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(_headers(token))
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self.on_request = on_request  # (endpoint, saniye, başarılı) -> metrik kaydı
+
+    # ---- altyapı
+    def _endpoint(self, method, url):
+        path = urlsplit(url).path
+        prefix = urlsplit(self.base_url).path
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+        return f"{method} {path}"
+
+    def _record(self, endpoint, ms, ok):
+        with self._stats_lock:
+            st = self._stats.setdefault(endpoint, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            st["count"] += 1
+            st["errors"] += 0 if ok else 1
+            st["total_ms"] += ms
+            st["max_ms"] = max(st["max_ms"], ms)
+        if self.on_request:
+            self.on_request(endpoint, ms / 1000, ok)
+
+    def request(self, method, path, **kw):
+        url = path if path.startswith("http") else f"{self.base_url}/{path.lstrip('/')}"
+        endpoint = self._endpoint(method, url)
+        self.limiter.wait()
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            r = self.session.request(method, url, timeout=kw.pop("timeout", self.timeout), **kw)
+            self.limiter.update(r)
+            r.raise_for_status()
+            ok = True
+            return r
+        finally:
+            self._record(endpoint, (time.perf_counter() - t0) * 1000, ok)
+
+    def _pages(self, path, key, params):
+        url = path
+        while url:
+            r = self.request("GET", url, params=params)
+            yield r.json().get(key, [])
+            url = r.links.get("next", {}).get("url")
+            params = None  # next URL page_info ve limit'i zaten içerir
+
+    def timings(self):
+        """Endpoint başına çağrı sayısı, hata ve süre (ms) özeti."""
+        with self._stats_lock:
+            return {k: dict(v, avg_ms=round(v["total_ms"] / v["count"], 2) if v["count"] else 0.0)
+                    for k, v in self._stats.items()}
+
+    # ---- API
+    def locations(self):
+        return self.request("GET", "locations.json").json().get("locations", [])
+
+    def iter_product_pages(self, limit=250, **params):
+        """Ürünleri sayfa sayfa üretir (Link: rel="next" cursor pagination); bellek sayfa başına sınırlı."""
+        yield from self._pages("products.json", "products", {"limit": limit, **params})
+
+    def set_inventory(self, location_id, inventory_item_id, new_qty):
+        payload = {"location_id": int(location_id), "inventory_item_id": int(inventory_item_id), "available": int(new_qty)}
+        return self.request("POST", "inventory_levels/set.json", json=payload).json()
+
+    def iter_inventory_levels(self, location_id, inventory_item_ids, batch=50):
+        """Lokasyondaki stok seviyelerini item id grupları halinde (Shopify: istek başına en çok 50) üretir."""
+        ids = [str(i) for i in inventory_item_ids]
+        for i in range(0, len(ids), batch):
+            params = {"location_ids": str(location_id), "inventory_item_ids": ",".join(ids[i:i + batch]),
+                      "limit": 250}
+            for page in self._pages("inventory_levels.json", "inventory_levels", params):
+                yield from page
+
+
+# ---- Outbox retry yardımcıları ----
+def is_retryable(exc):
+    """429/5xx ve ağ hataları tekrar denenir; diğer 4xx kalıcı hatadır."""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    resp = getattr(exc, "response", None)
+    if resp is None:
+        return False
+    return resp.status_code == 429 or resp.status_code >= 500
+
+def backoff_seconds(attempts, exc=None, base=5, cap=900):
+    """Üstel bekleme; 429'da Retry-After başlığına uyar."""
+    resp = getattr(exc, "response", None)
+    if resp is not None and resp.headers.get("Retry-After"):
+        try:
+            return max(1.0, float(resp.headers["Retry-After"]))
+        except ValueError:
+            pass
+    return min(cap, base * (2 ** max(0, attempts - 1)))
@@ -0,0 +1,32 @@
+import re
+import unicodedata
+
+# Arama anahtarları: Türkçe büyük/küçük harf ve aksan farkları katlanır
+# ("IŞIK", "ışık", "Isik" -> "isik"); DB'de indexli kolona yazılır.
+
+_TR_FOLD = str.maketrans({"İ": "i", "I": "i", "ı": "i", "Ş": "s", "ş": "s", "Ğ": "g", "ğ": "g",
+                          "Ü": "u", "ü": "u", "Ö": "o", "ö": "o", "Ç": "c", "ç": "c"})
+_WORD = re.compile(r"\w+")
+
+def tr_fold(text):
+    if not text:
+        return ""
+    t = text.translate(_TR_FOLD).lower()
+    if not t.isascii():
+        t = unicodedata.normalize("NFKD", t)
+        t = "".join(ch for ch in t if not unicodedata.combining(ch))
+    return " ".join(_WORD.findall(t))
+
+def phone_key(phone):
+    """Sadece rakamlar, ülke kodu/baştaki 0 atılmış: '+90 (532) 123 45 67' -> '5321234567'."""
+    digits = re.sub(r"\D", "", phone or "")
+    if digits.startswith("90") and len(digits) > 10:
+        digits = digits[2:]
+    return digits.lstrip("0")
+
+def looks_like_phone(q):
+    return bool(re.fullmatch(r"[\d\s()+\-]{3,}", q or ""))
+
+def prefix_range(col, key):
+    """col LIKE 'key%' yerine index dostu aralık: key <= col < key + U+FFFF."""
+    return (col >= key) & (col < key + "\uffff")